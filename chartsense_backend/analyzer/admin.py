@@ -1,7 +1,45 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import UploadedFile, AnalysisResult, ExtractedTable
 
 
+class LargeTablePaginator(Paginator):
+    """Paginator that estimates the row count of unfiltered changelists on PostgreSQL"""
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        
+        # The planner's estimate is only meaningful for the whole table
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+        
+        return super().count
+
+
+class ChangelistOnlyMixin:
+    """Restrict changelist queries to `changelist_only_fields`, leaving change forms untouched"""
+    changelist_only_fields = None
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = getattr(request, 'resolver_match', None)
+        opts = self.model._meta
+        if self.changelist_only_fields and match and match.url_name == f'{opts.app_label}_{opts.model_name}_changelist':
+            queryset = queryset.only(*self.changelist_only_fields)
+        return queryset
+
+
 @admin.register(UploadedFile)
 class UploadedFileAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'file_size', 'uploaded_at', 'analysis_status']
@@ -16,16 +54,40 @@ class UploadedFileAdmin(admin.ModelAdmin):
 
 
 @admin.register(AnalysisResult)
-class AnalysisResultAdmin(admin.ModelAdmin):
+class AnalysisResultAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     list_display = ['uploaded_file', 'status', 'total_pages', 'tables_found', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['uploaded_file__original_filename']
     readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['uploaded_file']
+    show_full_result_count = False
+    paginator = LargeTablePaginator
+    # Skip error_message on the changelist; it's only shown on the change form
+    changelist_only_fields = [
+        'id', 'status', 'total_pages', 'tables_found', 'created_at',
+        'uploaded_file__original_filename', 'uploaded_file__uploaded_at',
+    ]
+    
+    def get_queryset(self, request):
+        # __str__ of uploaded_file is rendered on every changelist row
+        return super().get_queryset(request).select_related('uploaded_file')
 
 
 @admin.register(ExtractedTable)
-class ExtractedTableAdmin(admin.ModelAdmin):
+class ExtractedTableAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     list_display = ['analysis_result', 'page_number', 'table_index', 'confidence_score']
     list_filter = ['page_number']
     search_fields = ['analysis_result__uploaded_file__original_filename']
-    readonly_fields = ['extracted_at']
\ No newline at end of file
+    readonly_fields = ['extracted_at']
+    raw_id_fields = ['analysis_result']
+    show_full_result_count = False
+    paginator = LargeTablePaginator
+    # The bounding_box and table_data JSON can be large and aren't listed
+    changelist_only_fields = [
+        'id', 'page_number', 'table_index', 'confidence_score',
+        'analysis_result__status', 'analysis_result__uploaded_file__original_filename',
+    ]
+    
+    def get_queryset(self, request):
+        # analysis_result.__str__ reaches through to the uploaded file's name
+        return super().get_queryset(request).select_related('analysis_result__uploaded_file')
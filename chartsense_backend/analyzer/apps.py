@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class AnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'analyzer'
\ No newline at end of file
+    name = 'analyzer'
+    
+    def ready(self):
+        # Connect the cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,28 @@
+import logging
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+logger = logging.getLogger(__name__)
+
+
+def exception_handler(exc, context):
+    """
+    Turn errors the views don't handle into the API's JSON error format
+    
+    DRF's handler still covers its own exceptions and Http404; anything else
+    is logged with its traceback and returned as a 500.
+    """
+    response = drf_exception_handler(exc, context)
+    if response is not None:
+        return response
+    
+    request = context.get('request')
+    logger.exception(f"Unhandled error for {getattr(request, 'path', 'request')}: {str(exc)}")
+    return Response(
+        {
+            "status": "error",
+            "message": f"Request processing failed: {str(exc)}"
+        },
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
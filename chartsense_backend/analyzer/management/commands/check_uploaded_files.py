@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analyzer.tasks import refresh_file_on_disk
+
+
+class Command(BaseCommand):
+    help = "Re-check uploaded files on disk and update their file_on_disk flags; run periodically, e.g. from cron"
+    
+    def handle(self, *args, **options):
+        missing, present = refresh_file_on_disk()
+        self.stdout.write(f"Flagged {missing} missing and {present} restored uploaded files")
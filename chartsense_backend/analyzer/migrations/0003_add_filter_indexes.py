@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-15 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_analysis_models'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='extractedtable',
+            name='page_number',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='uploadedfile',
+            name='analysis_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', help_text='Current analysis status', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='uploadedfile',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
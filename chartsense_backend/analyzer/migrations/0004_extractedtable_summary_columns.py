@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-15 21:48
+
+from django.db import migrations, models
+
+
+def populate_summary_columns(apps, schema_editor):
+    ExtractedTable = apps.get_model('analyzer', 'ExtractedTable')
+    
+    for table in ExtractedTable.objects.iterator():
+        data = table.table_data if isinstance(table.table_data, dict) else {}
+        table.row_count = len(data.get('rows') or [])
+        table.col_count = len(data.get('columns') or [])
+        try:
+            table.bbox_x1, table.bbox_y1, table.bbox_x2, table.bbox_y2 = (
+                float(value) for value in table.bounding_box[:4]
+            )
+        except (TypeError, ValueError, KeyError):
+            pass
+        table.save(update_fields=['row_count', 'col_count', 'bbox_x1', 'bbox_y1', 'bbox_x2', 'bbox_y2'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_add_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedtable',
+            name='bbox_x1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='extractedtable',
+            name='bbox_x2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='extractedtable',
+            name='bbox_y1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='extractedtable',
+            name='bbox_y2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='extractedtable',
+            name='col_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='extractedtable',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_summary_columns, migrations.RunPython.noop),
+    ]
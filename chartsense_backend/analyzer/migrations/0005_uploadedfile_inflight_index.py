@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 21:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_extractedtable_summary_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(condition=models.Q(('analysis_status__in', ['pending', 'processing'])), fields=['analysis_status'], name='uf_inflight_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0005_uploadedfile_inflight_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the file contents, used to reuse earlier analyses', max_length=64),
+        ),
+    ]
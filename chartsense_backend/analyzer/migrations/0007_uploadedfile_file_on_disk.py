@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_uploadedfile_content_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='file_on_disk',
+            field=models.BooleanField(default=True, help_text='Cleared when analysis finds the stored file missing'),
+        ),
+    ]
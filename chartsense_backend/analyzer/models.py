@@ -9,59 +9,76 @@ def upload_to_media(instance, filename):
     return os.path.join('uploads', filename)
 
 
+class AnalysisStatus(models.TextChoices):
+    """Lifecycle of a file's analysis, shared by UploadedFile and AnalysisResult"""
+    PENDING = 'pending', 'Pending'
+    PROCESSING = 'processing', 'Processing'
+    COMPLETED = 'completed', 'Completed'
+    FAILED = 'failed', 'Failed'
+
+
 class UploadedFile(models.Model):
     """Model to store uploaded PDF files"""
-    ANALYSIS_STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('processing', 'Processing'),
-        ('completed', 'Completed'),
-        ('failed', 'Failed'),
-    ]
-    
     file = models.FileField(
         upload_to=upload_to_media,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])],
         help_text="Only PDF files are allowed"
     )
     original_filename = models.CharField(max_length=255)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True, db_index=True)
     file_size = models.PositiveIntegerField(help_text="File size in bytes")
+    file_on_disk = models.BooleanField(
+        default=True,
+        help_text="Cleared when analysis finds the stored file missing"
+    )
+    content_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the file contents, used to reuse earlier analyses"
+    )
     analysis_status = models.CharField(
         max_length=20, 
-        choices=ANALYSIS_STATUS_CHOICES, 
-        default='pending',
+        choices=AnalysisStatus.choices, 
+        default=AnalysisStatus.PENDING,
+        db_index=True,
         help_text="Current analysis status"
     )
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Only in-flight work is indexed, so queue polls scan a small index
+            models.Index(
+                fields=['analysis_status'],
+                condition=models.Q(analysis_status__in=[AnalysisStatus.PENDING, AnalysisStatus.PROCESSING]),
+                name='uf_inflight_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.original_filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
     
     def delete(self, *args, **kwargs):
         """Delete file from storage when model instance is deleted"""
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+        # Imported here because tasks imports this module
+        from .tasks import enqueue_file_delete
+        
+        storage, name = self.file.storage, self.file.name
+        result = super().delete(*args, **kwargs)
+        if name:
+            enqueue_file_delete(storage, name)
+        return result
 
 
 class AnalysisResult(models.Model):
     """Model to store analysis results for uploaded files"""
-    STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('processing', 'Processing'),
-        ('completed', 'Completed'),
-        ('failed', 'Failed'),
-    ]
-    
     uploaded_file = models.OneToOneField(
         UploadedFile, 
         on_delete=models.CASCADE,
         related_name='analysis_result'
     )
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    status = models.CharField(max_length=20, choices=AnalysisStatus.choices, default=AnalysisStatus.PENDING, db_index=True)
     total_pages = models.PositiveIntegerField(default=0)
     pages_processed = models.PositiveIntegerField(default=0)
     tables_found = models.PositiveIntegerField(default=0)
@@ -71,7 +88,7 @@ class AnalysisResult(models.Model):
         blank=True,
         help_text="Processing time in seconds"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -88,7 +105,7 @@ class ExtractedTable(models.Model):
         on_delete=models.CASCADE,
         related_name='extracted_tables'
     )
-    page_number = models.PositiveIntegerField()
+    page_number = models.PositiveIntegerField(db_index=True)
     table_index = models.PositiveIntegerField(help_text="Index of table on the page")
     bounding_box = models.JSONField(
         help_text="Coordinates of the table bounding box"
@@ -96,6 +113,13 @@ class ExtractedTable(models.Model):
     table_data = models.JSONField(
         help_text="Structured table data as JSON"
     )
+    # Denormalized from table_data / bounding_box so summaries don't need the JSON
+    row_count = models.PositiveIntegerField(default=0)
+    col_count = models.PositiveIntegerField(default=0)
+    bbox_x1 = models.FloatField(null=True, blank=True)
+    bbox_y1 = models.FloatField(null=True, blank=True)
+    bbox_x2 = models.FloatField(null=True, blank=True)
+    bbox_y2 = models.FloatField(null=True, blank=True)
     confidence_score = models.FloatField(
         null=True, 
         blank=True,
@@ -110,15 +134,32 @@ class ExtractedTable(models.Model):
     def __str__(self):
         return f"Table {self.table_index} from page {self.page_number} - {self.analysis_result.uploaded_file.original_filename}"
     
+    def save(self, *args, **kwargs):
+        self.update_summary_fields()
+        super().save(*args, **kwargs)
+    
+    def update_summary_fields(self):
+        """Copy row/column counts and bounding box corners out of the JSON fields"""
+        data = self.table_data if isinstance(self.table_data, dict) else {}
+        self.row_count = len(data.get('rows') or [])
+        self.col_count = len(data.get('columns') or [])
+        
+        try:
+            self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2 = (
+                float(value) for value in self.bounding_box[:4]
+            )
+        except (TypeError, ValueError, KeyError):
+            self.bbox_x1 = self.bbox_y1 = self.bbox_x2 = self.bbox_y2 = None
+    
     @property
     def table_summary(self):
         """Return a summary of the table structure"""
-        if not self.table_data:
+        return self.summarize(self.row_count, self.col_count)
+    
+    @staticmethod
+    def summarize(row_count, col_count):
+        """Describe a table's size from its row and column counts"""
+        if not row_count and not col_count:
             return "No data"
         
-        try:
-            rows = len(self.table_data.get('rows', []))
-            cols = len(self.table_data.get('columns', []))
-            return f"{rows} rows × {cols} columns"
-        except:
-            return "Structure unknown"
\ No newline at end of file
+        return f"{row_count} rows × {col_count} columns"
\ No newline at end of file
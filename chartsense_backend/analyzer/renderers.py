@@ -0,0 +1,27 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# DRF's encoder covers the types orjson doesn't know (lazy strings, Decimal, ...).
+# Datetimes are passed through to it too, so they keep DRF's "Z"-suffixed
+# format rather than orjson's "+00:00" one.
+_fallback_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Render JSON responses with orjson instead of the standard library encoder"""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Serialize response data to JSON bytes"""
+        if data is None:
+            return b''
+        
+        return orjson.dumps(
+            data,
+            default=_fallback_encoder.default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        )
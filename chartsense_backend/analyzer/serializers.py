@@ -1,5 +1,7 @@
+import hashlib
+import os
 from rest_framework import serializers
-from .models import UploadedFile, AnalysisResult, ExtractedTable
+from .models import UploadedFile, ExtractedTable
 
 
 class FileUploadSerializer(serializers.ModelSerializer):
@@ -17,6 +19,12 @@ class FileUploadSerializer(serializers.ModelSerializer):
         if not value.name.lower().endswith('.pdf'):
             raise serializers.ValidationError("Only PDF files are allowed.")
         
+        # Check the PDF signature so misnamed files never reach the analysis pipeline
+        header = value.read(5)
+        value.seek(0)
+        if header != b'%PDF-':
+            raise serializers.ValidationError("Not a valid PDF file.")
+        
         # Check file size (10MB limit)
         if value.size > 10 * 1024 * 1024:
             raise serializers.ValidationError("File size cannot exceed 10MB.")
@@ -27,8 +35,23 @@ class FileUploadSerializer(serializers.ModelSerializer):
         """Create new uploaded file instance"""
         file = validated_data['file']
         validated_data['original_filename'] = file.name
-        validated_data['file_size'] = file.size
+        # Upload handlers record the size while streaming, so this normally
+        # costs nothing; only fall back to stat'ing the spooled file
+        file_size = getattr(file, 'size', None)
+        if file_size is None:
+            file_size = os.fstat(file.fileno()).st_size
+        validated_data['file_size'] = file_size
+        validated_data['content_sha256'] = self._hash_contents(file)
         return super().create(validated_data)
+    
+    @staticmethod
+    def _hash_contents(file):
+        """Return the SHA-256 hex digest of an uploaded file, read in chunks"""
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
 
 
 class FileUploadResponseSerializer(serializers.Serializer):
@@ -39,56 +62,123 @@ class FileUploadResponseSerializer(serializers.Serializer):
     message = serializers.CharField(required=False)
 
 
-class ExtractedTableSerializer(serializers.ModelSerializer):
-    """Serializer for extracted tables"""
-    table_summary = serializers.ReadOnlyField()
+def extracted_table_rows(queryset):
+    """
+    Build the extracted tables payload straight from database rows
     
-    class Meta:
-        model = ExtractedTable
-        fields = [
-            'id', 'page_number', 'table_index', 'bounding_box', 
-            'table_data', 'confidence_score', 'extracted_at', 'table_summary'
-        ]
+    Reads plain values instead of model instances, for endpoints that return
+    many tables with large JSON payloads.
+    
+    Args:
+        queryset: ExtractedTable queryset to read
+        
+    Returns:
+        List of table dicts, with table_summary and ISO 8601 extracted_at
+    """
+    to_datetime = serializers.DateTimeField().to_representation
+    rows = queryset.values(
+        'id', 'page_number', 'table_index', 'bounding_box', 'table_data',
+        'confidence_score', 'extracted_at', 'row_count', 'col_count'
+    )
+    return [
+        {
+            'id': row['id'],
+            'page_number': row['page_number'],
+            'table_index': row['table_index'],
+            'bounding_box': row['bounding_box'],
+            'table_data': row['table_data'],
+            'confidence_score': row['confidence_score'],
+            'extracted_at': to_datetime(row['extracted_at']),
+            'table_summary': ExtractedTable.summarize(row['row_count'], row['col_count']),
+        }
+        for row in rows
+    ]
 
 
-class AnalysisResultSerializer(serializers.ModelSerializer):
-    """Serializer for analysis results"""
-    extracted_tables = ExtractedTableSerializer(many=True, read_only=True)
-    filename = serializers.CharField(source='uploaded_file.original_filename', read_only=True)
+# Columns analysis_result_row() reads, for AnalysisResult.objects.values()
+ANALYSIS_RESULT_VALUES = (
+    'id', 'status', 'total_pages', 'pages_processed', 'tables_found',
+    'error_message', 'processing_time', 'created_at', 'updated_at'
+)
+
+
+def analysis_result_row(row, filename, tables, prefix=''):
+    """
+    Build the analysis result payload from an AnalysisResult values() row
     
-    class Meta:
-        model = AnalysisResult
-        fields = [
-            'id', 'filename', 'status', 'total_pages', 'pages_processed',
-            'tables_found', 'error_message', 'processing_time', 
-            'created_at', 'updated_at', 'extracted_tables'
-        ]
+    Args:
+        row: Dict with the ANALYSIS_RESULT_VALUES keys, each preceded by prefix
+        filename: Original name of the analyzed file
+        tables: The analysis's tables, as built by extracted_table_rows()
+        prefix: Lookup prefix when the row was read through a relation
+        
+    Returns:
+        Dict with the analysis fields, its filename and its tables
+    """
+    to_datetime = serializers.DateTimeField().to_representation
+    return {
+        'id': row[f'{prefix}id'],
+        'filename': filename,
+        'status': row[f'{prefix}status'],
+        'total_pages': row[f'{prefix}total_pages'],
+        'pages_processed': row[f'{prefix}pages_processed'],
+        'tables_found': row[f'{prefix}tables_found'],
+        'error_message': row[f'{prefix}error_message'],
+        'processing_time': row[f'{prefix}processing_time'],
+        'created_at': to_datetime(row[f'{prefix}created_at']),
+        'updated_at': to_datetime(row[f'{prefix}updated_at']),
+        'extracted_tables': tables,
+    }
+
+
+# Columns uploaded_file_rows() reads, for UploadedFile.objects.values()
+UPLOADED_FILE_LIST_VALUES = (
+    'id', 'original_filename', 'file_size', 'uploaded_at', 'analysis_status',
+    'analysis_result__id', 'analysis_result__status', 'analysis_result__tables_found',
+    'analysis_result__processing_time', 'analysis_result__created_at',
+    'analysis_result__error_message'
+)
+
+
+def uploaded_file_rows(rows):
+    """
+    Build the uploaded file listing from UploadedFile values() rows
+    
+    Args:
+        rows: Dicts with the UPLOADED_FILE_LIST_VALUES keys
+        
+    Returns:
+        List of file dicts, each with a summary of its analysis or None
+    """
+    to_datetime = serializers.DateTimeField().to_representation
+    return [
+        {
+            'id': row['id'],
+            'filename': row['original_filename'],
+            'file_size': row['file_size'],
+            'uploaded_at': to_datetime(row['uploaded_at']),
+            'analysis_status': row['analysis_status'],
+            'analysis_result': None if row['analysis_result__id'] is None else {
+                'id': row['analysis_result__id'],
+                'status': row['analysis_result__status'],
+                'tables_found': row['analysis_result__tables_found'],
+                'processing_time': row['analysis_result__processing_time'],
+                'created_at': to_datetime(row['analysis_result__created_at']),
+                'error_message': row['analysis_result__error_message'],
+            },
+        }
+        for row in rows
+    ]
 
 
 class AnalyzeRequestSerializer(serializers.Serializer):
     """Serializer for analysis request"""
     file_id = serializers.IntegerField(help_text="ID of the uploaded file to analyze")
-    
-    def validate_file_id(self, value):
-        """Validate that the file exists and hasn't been analyzed yet"""
-        try:
-            uploaded_file = UploadedFile.objects.get(id=value)
-            # Check if analysis already exists
-            if hasattr(uploaded_file, 'analysis_result'):
-                analysis = uploaded_file.analysis_result
-                if analysis.status in ['processing', 'completed']:
-                    raise serializers.ValidationError(
-                        f"File is already being analyzed or has been analyzed. Current status: {analysis.status}"
-                    )
-        except UploadedFile.DoesNotExist:
-            raise serializers.ValidationError("File with this ID does not exist.")
-        
-        return value
 
 
 class AnalyzeResponseSerializer(serializers.Serializer):
     """Serializer for analysis response"""
-    status = serializers.CharField()
+    status = serializers.ChoiceField(choices=['queued', 'info', 'error'])
     message = serializers.CharField()
     analysis_id = serializers.IntegerField(required=False)
     file_id = serializers.IntegerField()
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AnalysisResult, ExtractedTable
+from .tasks import invalidate_analysis_cache
+
+
+@receiver([post_save, post_delete], sender=AnalysisResult)
+def invalidate_analysis_result(sender, instance, **kwargs):
+    """Drop cached responses when an analysis is saved or deleted, including cascades"""
+    invalidate_analysis_cache(instance.pk)
+
+
+# Saves only: deletes come through the task paths, which invalidate
+# themselves, or cascade from AnalysisResult. A delete receiver here would
+# queue one invalidation per row and stop Django deleting tables in one query.
+@receiver(post_save, sender=ExtractedTable)
+def invalidate_extracted_table(sender, instance, **kwargs):
+    """Drop the owning analysis's cached responses when one of its tables is edited"""
+    invalidate_analysis_cache(instance.analysis_result_id)
@@ -1,13 +1,88 @@
+import io
 import os
+import json
+import hashlib
 import tempfile
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
-from rest_framework import status
+from rest_framework import serializers, status
 from unittest.mock import patch, MagicMock
+from urllib3.response import HTTPResponse
+from PIL import Image
 
 from .models import UploadedFile, AnalysisResult, ExtractedTable
+from .renderers import ORJSONRenderer
+from .serializers import UPLOADED_FILE_LIST_VALUES, extracted_table_rows, uploaded_file_rows
+from .utils.pdf_processor import PDFProcessor
+from .utils.table_extractor import TableExtractor, _clamp_bounding_boxes
+from .utils.huggingface_client import HuggingFaceClient, TokenBucket, _local_responses
+
+
+class ExtractedTableSerializer(serializers.ModelSerializer):
+    """Reference shape for the values()-based table payloads"""
+    table_summary = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = ExtractedTable
+        fields = [
+            'id', 'page_number', 'table_index', 'bounding_box',
+            'table_data', 'confidence_score', 'extracted_at', 'table_summary'
+        ]
+
+
+class AnalysisResultSerializer(serializers.ModelSerializer):
+    """Reference shape for the values()-based analysis detail payloads"""
+    extracted_tables = ExtractedTableSerializer(many=True, read_only=True)
+    filename = serializers.CharField(source='uploaded_file.original_filename', read_only=True)
+    
+    class Meta:
+        model = AnalysisResult
+        fields = [
+            'id', 'filename', 'status', 'total_pages', 'pages_processed',
+            'tables_found', 'error_message', 'processing_time',
+            'created_at', 'updated_at', 'extracted_tables'
+        ]
+
+
+class AnalysisResultSummarySerializer(serializers.ModelSerializer):
+    """Reference shape for the analysis summary in file listings"""
+    
+    class Meta:
+        model = AnalysisResult
+        fields = ['id', 'status', 'tables_found', 'processing_time', 'created_at', 'error_message']
+
+
+class UploadedFileListSerializer(serializers.ModelSerializer):
+    """Reference shape for the values()-based file listing"""
+    filename = serializers.CharField(source='original_filename', read_only=True)
+    analysis_result = AnalysisResultSummarySerializer(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = UploadedFile
+        fields = ['id', 'filename', 'file_size', 'uploaded_at', 'analysis_status', 'analysis_result']
+
+
+def make_pdf_bytes(pages=1):
+    """Build a small real PDF with the given number of pages"""
+    import fitz
+    
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {page_index + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
 
 
 class UploadedFileModelTest(TestCase):
@@ -41,6 +116,63 @@ class UploadedFileModelTest(TestCase):
         )
         
         self.assertIn("test.pdf", str(uploaded_file))
+    
+    @override_settings(ANALYSIS_TASK_ALWAYS_EAGER=True)
+    def test_delete_removes_file_after_commit(self):
+        """Test that the stored file is removed only once the delete commits"""
+        uploaded_file = UploadedFile.objects.create(
+            file=self.test_file,
+            original_filename="test.pdf",
+            file_size=1000
+        )
+        storage, name = uploaded_file.file.storage, uploaded_file.file.name
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            uploaded_file.delete()
+            self.assertTrue(storage.exists(name))
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(storage.exists(name))
+
+
+class ExtractedTableModelTest(TestCase):
+    """Test cases for ExtractedTable model"""
+    
+    def setUp(self):
+        uploaded_file = UploadedFile.objects.create(
+            file=SimpleUploadedFile("test.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="test.pdf",
+            file_size=1000
+        )
+        self.analysis = AnalysisResult.objects.create(uploaded_file=uploaded_file)
+    
+    def test_summary_columns_populated_on_save(self):
+        """Test row/column counts and bbox corners are copied out of the JSON"""
+        table = ExtractedTable.objects.create(
+            analysis_result=self.analysis,
+            page_number=1,
+            table_index=0,
+            bounding_box=[10, 20, 300, 400],
+            table_data={'rows': [['A', 'B'], ['1', '2'], ['3', '4']], 'columns': ['Col1', 'Col2']}
+        )
+        
+        self.assertEqual(table.row_count, 3)
+        self.assertEqual(table.col_count, 2)
+        self.assertEqual([table.bbox_x1, table.bbox_y1, table.bbox_x2, table.bbox_y2], [10, 20, 300, 400])
+        self.assertEqual(table.table_summary, "3 rows × 2 columns")
+    
+    def test_summary_without_data(self):
+        """Test summary of a table with no structure"""
+        table = ExtractedTable.objects.create(
+            analysis_result=self.analysis,
+            page_number=1,
+            table_index=0,
+            bounding_box={},
+            table_data={}
+        )
+        
+        self.assertIsNone(table.bbox_x1)
+        self.assertEqual(table.table_summary, "No data")
 
 
 class FileUploadAPITest(APITestCase):
@@ -50,7 +182,7 @@ class FileUploadAPITest(APITestCase):
         """Test successful PDF upload"""
         test_file = SimpleUploadedFile(
             "test.pdf",
-            b"fake pdf content",
+            b"%PDF-1.4 fake pdf content",
             content_type="application/pdf"
         )
         
@@ -61,8 +193,33 @@ class FileUploadAPITest(APITestCase):
         self.assertEqual(response.data['status'], 'uploaded')
         self.assertEqual(response.data['filename'], 'test.pdf')
         
-        # Check if file was saved to database
+        # Check if file was saved to database with its content digest
         self.assertEqual(UploadedFile.objects.count(), 1)
+        self.assertEqual(
+            UploadedFile.objects.get().content_sha256,
+            hashlib.sha256(b"%PDF-1.4 fake pdf content").hexdigest()
+        )
+    
+    def test_large_upload_is_moved_into_storage(self):
+        """Test uploads spooled to disk are moved into MEDIA_ROOT rather than rewritten"""
+        from django.core.files.move import file_move_safe
+        
+        test_file = SimpleUploadedFile(
+            "large.pdf",
+            b"%PDF-1.4 " + b"0" * (512 * 1024),
+            content_type="application/pdf"
+        )
+        url = reverse('analyzer:upload_file')
+        with patch('django.core.files.storage.filesystem.file_move_safe', wraps=file_move_safe) as mock_move:
+            response = self.client.post(url, {'file': test_file}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_move.assert_called_once()
+        self.assertTrue(mock_move.call_args[0][0].startswith(settings.FILE_UPLOAD_TEMP_DIR))
+        # The spool directory must not be reachable under MEDIA_URL
+        media_root = os.path.join(os.path.realpath(settings.MEDIA_ROOT), '')
+        self.assertFalse(os.path.realpath(settings.FILE_UPLOAD_TEMP_DIR).startswith(media_root))
+        UploadedFile.objects.get().file.delete(save=False)
     
     def test_upload_non_pdf_file(self):
         """Test upload of non-PDF file"""
@@ -78,6 +235,32 @@ class FileUploadAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('Only PDF files are allowed', response.data['message'])
     
+    def test_upload_misnamed_file(self):
+        """Test upload of a non-PDF file with a .pdf extension"""
+        test_file = SimpleUploadedFile(
+            "test.pdf",
+            b"text content",
+            content_type="application/pdf"
+        )
+        
+        url = reverse('analyzer:upload_file')
+        response = self.client.post(url, {'file': test_file}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Not a valid PDF file.', response.data['errors']['file'])
+        self.assertEqual(UploadedFile.objects.count(), 0)
+    
+    def test_upload_rejects_oversized_body_before_parsing(self):
+        """Test a too-large Content-Length is refused without reading the body"""
+        url = reverse('analyzer:upload_file')
+        with patch('rest_framework.request.Request._parse') as mock_parse:
+            response = self.client.post(
+                url, {}, format='multipart', CONTENT_LENGTH=str(11 * 1024 * 1024)
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_parse.assert_not_called()
+    
     def test_upload_no_file(self):
         """Test upload request without file"""
         url = reverse('analyzer:upload_file')
@@ -86,13 +269,33 @@ class FileUploadAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('No file provided', response.data['message'])
     
+    def test_health_check_reuses_recent_result(self):
+        """Test repeated health checks within the cache timeout skip the component probes"""
+        caches['default'].clear()
+        url = reverse('analyzer:health_check')
+        first = self.client.get(url)
+        
+        with patch('analyzer.views.os.path.exists') as mock_exists, self.assertNumQueries(0):
+            second = self.client.get(url)
+        
+        mock_exists.assert_not_called()
+        self.assertEqual((second.status_code, second.data), (first.status_code, first.data))
+        self.assertEqual(first.data['components']['database'], 'connected')
+    
     def test_upload_status_endpoint(self):
         """Test upload status endpoint"""
         url = reverse('analyzer:upload_status')
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['status'], 'active')
+        self.assertEqual(response.json()['status'], 'active')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.head(url).status_code, status.HTTP_200_OK)
+        options = self.client.options(url)
+        self.assertEqual(options.status_code, status.HTTP_200_OK)
+        self.assertEqual(options['Allow'], 'GET, HEAD, OPTIONS')
 
 
 class AnalysisAPITest(APITestCase):
@@ -110,7 +313,9 @@ class AnalysisAPITest(APITestCase):
             file_size=1000
         )
     
-    @patch('analyzer.views.TableExtractor')
+    @override_settings(ANALYSIS_TASK_ALWAYS_EAGER=True)
+    @patch('analyzer.tasks._extractor', None)
+    @patch('analyzer.tasks.TableExtractor')
     @patch('analyzer.views.settings.HUGGINGFACE_API_KEY', 'test-key')
     def test_analyze_file_success(self, mock_extractor_class):
         """Test successful file analysis"""
@@ -134,15 +339,225 @@ class AnalysisAPITest(APITestCase):
         url = reverse('analyzer:analyze_file')
         response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
         
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['status'], 'completed')
-        self.assertEqual(response.data['tables_found'], 1)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
         
-        # Check if analysis result was created
-        self.assertTrue(hasattr(self.uploaded_file, 'analysis_result'))
+        # Check if analysis result was created and completed by the task
+        analysis = AnalysisResult.objects.get(id=response.data['analysis_id'])
+        self.assertEqual(analysis.status, 'completed')
+        self.assertEqual(analysis.tables_found, 1)
+        self.assertEqual(analysis.total_pages, 2)
+        self.uploaded_file.refresh_from_db()
+        self.assertEqual(self.uploaded_file.analysis_status, 'completed')
         
-        # Check if extracted table was created
+        # Check if extracted table was created with its summary columns
         self.assertEqual(ExtractedTable.objects.count(), 1)
+        table = ExtractedTable.objects.get()
+        self.assertEqual((table.row_count, table.col_count), (2, 2))
+        self.assertEqual(table.bbox_x2, 100.0)
+    
+    @override_settings(ANALYSIS_TASK_ALWAYS_EAGER=True, ENABLE_FALLBACK_TABLE_DETECTION=True)
+    @patch('analyzer.tasks._extractor', None)
+    @patch('analyzer.tasks.TableExtractor')
+    @patch('analyzer.views.settings.HUGGINGFACE_API_KEY', 'test-key')
+    def test_analyze_file_falls_back_when_extraction_fails(self, mock_extractor_class):
+        """Test an extraction error stores the fallback table instead of failing"""
+        mock_extractor_class.return_value.extract_tables_from_pdf.side_effect = RuntimeError('models down')
+        
+        url = reverse('analyzer:analyze_file')
+        response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        
+        analysis = AnalysisResult.objects.get(id=response.data['analysis_id'])
+        self.assertEqual((analysis.status, analysis.tables_found), ('completed', 1))
+        self.assertIn('fallback', analysis.error_message)
+        table = analysis.extracted_tables.get()
+        self.assertTrue(table.table_data['fallback_used'])
+        self.assertEqual((table.row_count, table.col_count), (5, 6))
+        self.uploaded_file.refresh_from_db()
+        self.assertEqual(self.uploaded_file.analysis_status, 'completed')
+    
+    @override_settings(ANALYSIS_TASK_ALWAYS_EAGER=True)
+    @patch('analyzer.tasks._extractor', None)
+    @patch('analyzer.tasks.TableExtractor')
+    @patch('analyzer.views.settings.HUGGINGFACE_API_KEY', 'test-key')
+    def test_analyze_identical_file_reuses_tables(self, mock_extractor_class):
+        """Test that a file with the same contents copies the earlier analysis"""
+        digest = hashlib.sha256(b"fake pdf content").hexdigest()
+        UploadedFile.objects.filter(pk=self.uploaded_file.pk).update(content_sha256=digest)
+        prior = AnalysisResult.objects.create(
+            uploaded_file=self.uploaded_file, status='completed', total_pages=3, pages_processed=3, tables_found=1
+        )
+        ExtractedTable.objects.create(
+            analysis_result=prior, page_number=2, table_index=0,
+            bounding_box=[0, 0, 100, 100], table_data={'rows': [1, 2], 'columns': [1]}
+        )
+        duplicate = UploadedFile.objects.create(
+            file=SimpleUploadedFile("copy.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="copy.pdf",
+            file_size=1000,
+            content_sha256=digest
+        )
+        
+        url = reverse('analyzer:analyze_file')
+        response = self.client.post(url, {'file_id': duplicate.id}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_extractor_class.return_value.extract_tables_from_pdf.assert_not_called()
+        analysis = AnalysisResult.objects.get(id=response.data['analysis_id'])
+        self.assertEqual((analysis.status, analysis.total_pages, analysis.tables_found), ('completed', 3, 1))
+        table = analysis.extracted_tables.get()
+        self.assertEqual((table.page_number, table.row_count, table.col_count), (2, 2, 1))
+        self.assertEqual(prior.extracted_tables.count(), 1)
+    
+    def test_analyze_completed_file_reports_existing_result(self):
+        """Test re-analyzing a completed file answers from a single joined query"""
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file, status='completed', tables_found=2)
+        url = reverse('analyzer:analyze_file')
+        
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['analysis_id'], response.data['tables_found']), (analysis.id, 2))
+    
+    @patch('analyzer.views.enqueue_analysis')
+    @patch('analyzer.views.settings.HUGGINGFACE_API_KEY', 'test-key')
+    def test_analyze_missing_file_flags_it_off_disk(self, mock_enqueue):
+        """Test a first analyze of a missing file 404s at once and later requests skip the stat"""
+        os.remove(self.uploaded_file.file.path)
+        url = reverse('analyzer:analyze_file')
+        
+        response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        mock_enqueue.assert_not_called()
+        self.uploaded_file.refresh_from_db()
+        self.assertFalse(self.uploaded_file.file_on_disk)
+        
+        with patch('analyzer.views.os.path.exists') as mock_exists:
+            response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        mock_exists.assert_not_called()
+    
+    @patch('analyzer.tasks._extractor', None)
+    @patch('analyzer.tasks.TableExtractor')
+    def test_missing_file_is_not_reused_from_identical_upload(self, mock_extractor_class):
+        """Test a missing file whose hash matches an earlier analysis fails instead of copying its tables"""
+        from .tasks import run_analysis
+        
+        digest = hashlib.sha256(b"fake pdf content").hexdigest()
+        prior_file = UploadedFile.objects.create(
+            file=SimpleUploadedFile("prior.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="prior.pdf",
+            file_size=1000,
+            content_sha256=digest
+        )
+        prior = AnalysisResult.objects.create(uploaded_file=prior_file, status='completed', tables_found=1)
+        ExtractedTable.objects.create(
+            analysis_result=prior, page_number=1, table_index=0,
+            bounding_box=[0, 0, 100, 100], table_data={'rows': [1], 'columns': [1]}
+        )
+        UploadedFile.objects.filter(pk=self.uploaded_file.pk).update(content_sha256=digest)
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file, status='processing')
+        os.remove(self.uploaded_file.file.path)
+        
+        run_analysis(analysis.id)
+        
+        analysis.refresh_from_db()
+        self.assertEqual(analysis.status, 'failed')
+        self.assertFalse(analysis.extracted_tables.exists())
+        self.uploaded_file.refresh_from_db()
+        self.assertFalse(self.uploaded_file.file_on_disk)
+    
+    def test_check_uploaded_files_command_updates_flags(self):
+        """Test the janitor flags missing files and restores files that are back"""
+        from django.core.management import call_command
+        
+        restored = UploadedFile.objects.create(
+            file=SimpleUploadedFile("restored.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="restored.pdf",
+            file_size=1000,
+            file_on_disk=False
+        )
+        os.remove(self.uploaded_file.file.path)
+        output = io.StringIO()
+        
+        call_command('check_uploaded_files', stdout=output)
+        
+        self.assertEqual(
+            dict(UploadedFile.objects.values_list('pk', 'file_on_disk')),
+            {self.uploaded_file.pk: False, restored.pk: True}
+        )
+        self.assertIn('Flagged 1 missing and 1 restored', output.getvalue())
+    
+    @patch('analyzer.tasks.connection')
+    @patch('analyzer.tasks.run_analysis', side_effect=RuntimeError('worker crashed'))
+    def test_background_crash_marks_analysis_failed(self, mock_run, mock_connection):
+        """Test an unexpected task error fails the analysis instead of leaving it processing"""
+        from .tasks import _run_in_background
+        
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file, status='processing')
+        UploadedFile.objects.filter(pk=self.uploaded_file.pk).update(analysis_status='processing')
+        
+        _run_in_background(analysis.id)
+        
+        analysis.refresh_from_db()
+        self.assertEqual((analysis.status, analysis.error_message), ('failed', 'worker crashed'))
+        self.uploaded_file.refresh_from_db()
+        self.assertEqual(self.uploaded_file.analysis_status, 'failed')
+        mock_connection.close.assert_called_once()
+    
+    @patch('analyzer.tasks._extractor', None)
+    @patch('analyzer.tasks.TableExtractor')
+    def test_running_analysis_heartbeat_keeps_its_claim(self, mock_extractor_class):
+        """Test each processed run of pages refreshes updated_at so a long PDF isn't re-claimed"""
+        from .tasks import run_analysis
+        
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file, status='processing')
+        long_ago = timezone.now() - timedelta(hours=2)
+        heartbeats = []
+        
+        def extract(pdf_path, on_progress=None):
+            AnalysisResult.objects.filter(pk=analysis.pk).update(updated_at=long_ago)
+            on_progress()
+            heartbeats.append(AnalysisResult.objects.get(pk=analysis.pk).updated_at)
+            return {'total_pages': 1, 'pages_processed': 1, 'tables': []}
+        
+        mock_extractor_class.return_value.extract_tables_from_pdf.side_effect = extract
+        run_analysis(analysis.id)
+        
+        self.assertGreater(heartbeats[0], long_ago + timedelta(hours=1))
+    
+    @override_settings(ANALYSIS_STALE_AFTER=60)
+    @patch('analyzer.views.enqueue_analysis')
+    @patch('analyzer.views.settings.HUGGINGFACE_API_KEY', 'test-key')
+    def test_stale_processing_analysis_is_reclaimed(self, mock_enqueue):
+        """Test an analysis stuck in processing past the timeout can be queued again"""
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file, status='processing')
+        url = reverse('analyzer:analyze_file')
+        
+        response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_enqueue.assert_not_called()
+        
+        AnalysisResult.objects.filter(pk=analysis.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_enqueue.assert_called_once_with(analysis.id)
+    
+    def test_build_tables_skips_malformed_entries(self):
+        """Test tables missing required keys are skipped rather than failing the analysis"""
+        from .tasks import _build_tables
+        
+        analysis = AnalysisResult.objects.create(uploaded_file=self.uploaded_file)
+        tables = _build_tables(analysis, [
+            {'page_number': 1, 'table_index': 0, 'bounding_box': [0, 0, 10, 10], 'table_data': {'rows': [1]}},
+            {'page_number': 1, 'table_index': 1},
+        ])
+        
+        self.assertEqual([(table.table_index, table.row_count) for table in tables], [(0, 1)])
     
     def test_analyze_file_invalid_id(self):
         """Test analysis with invalid file ID"""
@@ -158,4 +573,702 @@ class AnalysisAPITest(APITestCase):
         response = self.client.post(url, {'file_id': self.uploaded_file.id}, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
-        self.assertIn('API key not configured', response.data['message'])
\ No newline at end of file
+        self.assertIn('API key not configured', response.data['message'])
+
+class ReadEndpointQueryTest(APITestCase):
+    """Test that read endpoints don't issue a query per related row"""
+    
+    def setUp(self):
+        caches['default'].clear()
+        for index in range(3):
+            uploaded_file = UploadedFile.objects.create(
+                file=SimpleUploadedFile(f"test{index}.pdf", b"fake pdf content", content_type="application/pdf"),
+                original_filename=f"test{index}.pdf",
+                file_size=1000
+            )
+            analysis = AnalysisResult.objects.create(uploaded_file=uploaded_file, status='completed')
+            for table_index in range(2):
+                ExtractedTable.objects.create(
+                    analysis_result=analysis,
+                    page_number=1,
+                    table_index=table_index,
+                    bounding_box=[0, 0, 100, 100],
+                    table_data={'rows': [], 'columns': []}
+                )
+        self.analysis = analysis
+    
+    def test_list_uploaded_files_single_query(self):
+        """Test listing files counts in the database and joins analysis results in one page query"""
+        url = reverse('analyzer:list_uploaded_files')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(queries), 2)
+        self.assertIn('COUNT(*)', queries[0]['sql'])
+        self.assertIn('LIMIT 50', queries[1]['sql'])
+        self.assertNotIn('"analyzer_uploadedfile"."file"', queries[1]['sql'])
+        self.assertNotIn('"analyzer_analysisresult"."total_pages"', queries[1]['sql'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['files_count'], 3)
+        self.assertEqual(response.data['count'], 3)
+        self.assertIsNone(response.data['next'])
+    
+    def test_list_uploaded_files_paginates_with_limit(self):
+        """Test a limit pages the listing and reports the total"""
+        UploadedFile.objects.create(
+            file=SimpleUploadedFile("pending.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="pending.pdf",
+            file_size=1000
+        )
+        url = reverse('analyzer:list_uploaded_files')
+        response = self.client.get(url, {'limit': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['files_count'], 2)
+        self.assertEqual(response.data['count'], 4)
+        self.assertIn('offset=2', response.data['next'])
+        self.assertEqual([file['filename'] for file in response.data['files']], ['pending.pdf', 'test2.pdf'])
+        self.assertIsNone(response.data['files'][0]['analysis_result'])
+        self.assertEqual(response.data['files'][1]['analysis_result']['status'], 'completed')
+    
+    def test_uploaded_file_rows_match_serializer(self):
+        """Test the values()-based listing matches the model serializer"""
+        UploadedFile.objects.create(
+            file=SimpleUploadedFile("pending.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="pending.pdf",
+            file_size=1000
+        )
+        AnalysisResult.objects.filter(pk=self.analysis.pk).update(processing_time=1.5, error_message='note')
+        files = UploadedFile.objects.select_related('analysis_result')
+        
+        self.assertEqual(
+            uploaded_file_rows(UploadedFile.objects.values(*UPLOADED_FILE_LIST_VALUES)),
+            json.loads(json.dumps(UploadedFileListSerializer(files, many=True).data))
+        )
+    
+    def test_get_analysis_result_query_count(self):
+        """Test analysis detail loads the file and tables without N+1"""
+        url = reverse('analyzer:get_analysis_result', args=[self.analysis.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['extracted_tables']), 2)
+    
+    def test_detail_endpoints_match_serializer(self):
+        """Test the values()-based detail payloads match AnalysisResultSerializer"""
+        AnalysisResult.objects.filter(pk=self.analysis.pk).update(processing_time=2.5, total_pages=4)
+        analysis = AnalysisResult.objects.get(pk=self.analysis.pk)
+        expected = json.loads(json.dumps(AnalysisResultSerializer(analysis).data))
+        
+        result = self.client.get(reverse('analyzer:get_analysis_result', args=[analysis.id]))
+        with self.assertNumQueries(2):
+            details = self.client.get(reverse('analyzer:get_file_details', args=[analysis.uploaded_file_id]))
+        
+        self.assertEqual(result.json(), expected)
+        self.assertEqual(details.json()['analysis_result'], expected)
+        self.assertEqual(details.json()['filename'], 'test2.pdf')
+    
+    def test_file_details_without_analysis(self):
+        """Test file details for a file never analyzed, and for a missing file"""
+        uploaded_file = UploadedFile.objects.create(
+            file=SimpleUploadedFile("pending.pdf", b"fake pdf content", content_type="application/pdf"),
+            original_filename="pending.pdf",
+            file_size=1000
+        )
+        
+        response = self.client.get(reverse('analyzer:get_file_details', args=[uploaded_file.id]))
+        missing = self.client.get(reverse('analyzer:get_file_details', args=[uploaded_file.id + 100]))
+        
+        self.assertIsNone(response.data['analysis_result'])
+        self.assertEqual(response.data['analysis_status'], 'pending')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_get_extracted_tables_loads_only_needed_columns(self):
+        """Test the tables endpoint doesn't load unused analysis or file columns"""
+        url = reverse('analyzer:get_extracted_tables', args=[self.analysis.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['filename'], 'test2.pdf')
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"analyzer_analysisresult"."error_message"', queries[0]['sql'])
+        self.assertNotIn('"analyzer_uploadedfile"."file_size"', queries[0]['sql'])
+    
+    def test_extracted_table_rows_match_serializer(self):
+        """Test the values()-based table payload matches the model serializer"""
+        ExtractedTable.objects.filter(analysis_result=self.analysis, table_index=1).update(
+            table_data={'rows': [1, 2, 3], 'columns': [1]}, row_count=3, col_count=1
+        )
+        tables = ExtractedTable.objects.filter(analysis_result=self.analysis)
+        
+        self.assertEqual(extracted_table_rows(tables), ExtractedTableSerializer(tables, many=True).data)
+    
+    def test_missing_analysis_returns_404(self):
+        """Test a missing analysis is reported as not found rather than a server error"""
+        url = reverse('analyzer:get_analysis_result', args=[self.analysis.id + 100])
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_unhandled_errors_return_json_500(self):
+        """Test unexpected view errors go through the API exception handler"""
+        url = reverse('analyzer:list_uploaded_files')
+        with patch('analyzer.views.uploaded_file_rows', side_effect=RuntimeError('boom')), \
+                self.assertLogs('analyzer.exceptions', level='ERROR'):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data, {'status': 'error', 'message': 'Request processing failed: boom'})
+    
+    def test_completed_analysis_responses_are_cached(self):
+        """Test completed results are served from cache until the analysis is rewritten"""
+        from .tasks import invalidate_analysis_cache
+        
+        result_url = reverse('analyzer:get_analysis_result', args=[self.analysis.id])
+        tables_url = reverse('analyzer:get_extracted_tables', args=[self.analysis.id])
+        first = self.client.get(result_url).data
+        self.assertEqual(self.client.get(tables_url).data['tables_count'], 2)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(result_url).data, first)
+            self.assertEqual(self.client.get(tables_url).data['tables_count'], 2)
+        
+        self.analysis.extracted_tables.filter(table_index=1).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_analysis_cache(self.analysis.id)
+        self.assertEqual(self.client.get(tables_url).data['tables_count'], 1)
+    
+    def test_deleting_tables_stays_a_single_query(self):
+        """Test table deletes and file cascades neither load table JSON nor queue per-row invalidations"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(1):
+                ExtractedTable.objects.filter(analysis_result=self.analysis).delete()
+        self.assertEqual(callbacks, [])
+        
+        ExtractedTable.objects.create(
+            analysis_result=self.analysis, page_number=1, table_index=0,
+            bounding_box=[0, 0, 100, 100], table_data={'rows': [], 'columns': []}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks() as callbacks:
+                UploadedFile.objects.filter(pk=self.analysis.uploaded_file_id).delete()
+        self.assertFalse(any('"table_data"' in query['sql'] for query in queries))
+        self.assertEqual(len(callbacks), 1)
+    
+    def test_saving_a_table_invalidates_cached_tables(self):
+        """Test editing a table outside the task, e.g. in the admin, drops the cached payload"""
+        url = reverse('analyzer:get_extracted_tables', args=[self.analysis.id])
+        self.client.get(url)
+        
+        table = self.analysis.extracted_tables.get(table_index=0)
+        table.table_data = {'rows': [[1], [2]], 'columns': ['A']}
+        with self.captureOnCommitCallbacks(execute=True):
+            table.save()
+        
+        tables = self.client.get(url).data['tables']
+        self.assertEqual(tables[0]['table_summary'], '2 rows × 1 columns')
+    
+    def test_bulk_file_delete_invalidates_cached_results(self):
+        """Test a queryset delete, as the admin does, stops serving the cached result"""
+        url = reverse('analyzer:get_analysis_result', args=[self.analysis.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            UploadedFile.objects.filter(pk=self.analysis.uploaded_file_id).delete()
+        
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(ANALYSIS_CACHE_TIMEOUT=60)
+    def test_completed_analysis_cache_entries_expire(self):
+        """Test cached payloads get a finite timeout so other processes eventually catch up"""
+        url = reverse('analyzer:get_analysis_result', args=[self.analysis.id])
+        with patch('analyzer.views.cache.set') as mock_set:
+            self.client.get(url)
+        
+        self.assertEqual(mock_set.call_args.args[2], 60)
+    
+    def test_completed_analysis_responses_support_etags(self):
+        """Test a client holding the current ETag gets 304 with no body"""
+        url = reverse('analyzer:get_extracted_tables', args=[self.analysis.id])
+        first = self.client.get(url)
+        etag = first['ETag']
+        
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        stale = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+        self.assertEqual(stale.json(), first.json())
+    
+    def test_in_progress_analysis_is_not_cached(self):
+        """Test results are only cached once the analysis has completed"""
+        AnalysisResult.objects.filter(pk=self.analysis.pk).update(status='processing')
+        url = reverse('analyzer:get_analysis_result', args=[self.analysis.id])
+        self.client.get(url)
+        
+        AnalysisResult.objects.filter(pk=self.analysis.pk).update(status='completed')
+        self.assertEqual(self.client.get(url).data['status'], 'completed')
+    
+    def test_admin_changelist_skips_json_columns(self):
+        """Test the extracted table changelist neither loads JSON nor queries per row"""
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        url = reverse('admin:analyzer_extractedtable_changelist')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'test2.pdf')
+        row_queries = [q['sql'] for q in queries if '"analyzer_extractedtable"."table_index"' in q['sql']]
+        self.assertEqual(len(row_queries), 1)
+        self.assertNotIn('"table_data"', row_queries[0])
+        self.assertFalse(any('FROM "analyzer_analysisresult"' in q['sql'] for q in queries))
+
+
+class ORJSONRendererTest(TestCase):
+    """Test cases for the orjson response renderer"""
+    
+    def test_render_handles_drf_and_numpy_types(self):
+        """Test values outside orjson's native types still serialize"""
+        from decimal import Decimal
+        import numpy as np
+        from django.utils.translation import gettext_lazy
+        
+        body = ORJSONRenderer().render({
+            'message': gettext_lazy('Not found.'),
+            'score': Decimal('0.5'),
+            'box': np.array([1, 2]),
+        })
+        
+        self.assertEqual(json.loads(body), {'message': 'Not found.', 'score': 0.5, 'box': [1, 2]})
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+    
+    def test_render_formats_datetimes_like_drf(self):
+        """Test datetimes keep DRF's format, with a Z suffix for UTC"""
+        from datetime import datetime, timezone as dt_timezone
+        from rest_framework.utils.encoders import JSONEncoder
+        
+        moment = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        body = ORJSONRenderer().render({'at': moment})
+        
+        self.assertEqual(json.loads(body), {'at': '2024-05-01T12:30:15.123456Z'})
+        self.assertEqual(json.loads(body)['at'], json.loads(json.dumps(moment, cls=JSONEncoder)))
+    
+    def test_api_responses_use_renderer(self):
+        """Test API views render through orjson"""
+        import orjson
+        
+        with patch('analyzer.renderers.orjson.dumps', wraps=orjson.dumps) as mock_dumps:
+            response = self.client.get(reverse('analyzer:list_uploaded_files'))
+        
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['files_count'], 0)
+        mock_dumps.assert_called_once()
+
+
+class TableExtractorTest(TestCase):
+    """Test cases for the table extraction pipeline with the HF API mocked out"""
+    
+    DETECTIONS = [
+        {'score': 0.9, 'label': 'table', 'box': {'xmin': 10, 'ymin': 20, 'xmax': 300, 'ymax': 200}},
+        {'score': 0.8, 'label': 'table', 'box': {'xmin': 10, 'ymin': 300, 'xmax': 300, 'ymax': 500}},
+    ]
+    
+    def setUp(self):
+        handle, self.pdf_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(handle, 'wb') as pdf_file:
+            pdf_file.write(make_pdf_bytes(pages=3))
+        self.addCleanup(os.remove, self.pdf_path)
+        
+        self.queried_models = []
+        self.structure_inputs = []
+        sleep_patcher = patch('analyzer.utils.huggingface_client.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def test_pdf_to_images_parallel_matches_inline(self):
+        """Test rendering in worker processes returns the same pages in order"""
+        processor = PDFProcessor()
+        processor.render_workers = 1
+        inline_images = processor.pdf_to_images(self.pdf_path)
+        
+        processor.render_workers = 2
+        self.assertEqual(processor.pdf_to_images(self.pdf_path), inline_images)
+        self.assertEqual([page for page, _ in inline_images], [1, 2, 3])
+        # Pages are sent to the models as JPEG by default
+        self.assertTrue(inline_images[0][1].startswith(b'\xff\xd8\xff'))
+    
+    def test_broken_render_pool_is_replaced_and_pages_render_inline(self):
+        """Test a pool broken by a dead worker is discarded rather than reused forever"""
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+        
+        def broken_submit(*args, **kwargs):
+            future = Future()
+            future.set_exception(BrokenProcessPool('worker died'))
+            return future
+        
+        processor = PDFProcessor()
+        processor.render_workers = 1
+        inline_images = processor.pdf_to_images(self.pdf_path)
+        
+        processor.render_workers = 2
+        broken_pool = MagicMock()
+        broken_pool.submit.side_effect = broken_submit
+        with patch.object(PDFProcessor, '_executor', broken_pool):
+            self.assertEqual(processor.pdf_to_images(self.pdf_path), inline_images)
+            self.assertIsNone(PDFProcessor._executor)
+        broken_pool.shutdown.assert_called_once()
+    
+    def test_iter_page_images_renders_a_bounded_window_ahead(self):
+        """Test page runs are yielded in order with only one run per worker queued ahead"""
+        with open(self.pdf_path, 'wb') as pdf_file:
+            pdf_file.write(make_pdf_bytes(pages=6))
+        processor = PDFProcessor()
+        processor.render_workers = 2
+        executor = PDFProcessor._get_executor(processor.render_workers)
+        
+        with patch.object(executor, 'submit', wraps=executor.submit) as mock_submit:
+            runs = processor.iter_page_images(self.pdf_path, pages_per_run=1)
+            first_run = next(runs)
+            self.assertEqual(mock_submit.call_count, 3)
+            remaining_runs = list(runs)
+        
+        self.assertEqual([[page for page, _ in run] for run in [first_run] + remaining_runs],
+                         [[1], [2], [3], [4], [5], [6]])
+    
+    def test_iter_page_images_yields_first_page_alone(self):
+        """Test streaming hands over page one before the first full run is rendered"""
+        processor = PDFProcessor()
+        for render_workers in (1, 2):
+            processor.render_workers = render_workers
+            runs = processor.iter_page_images(self.pdf_path, pages_per_run=2)
+            self.assertEqual([[page for page, _ in run] for run in runs], [[1], [2, 3]])
+    
+    def test_pdf_to_images_caps_longest_edge(self):
+        """Test pages larger than the edge cap are rendered down to it"""
+        import fitz
+        
+        processor = PDFProcessor()
+        processor.render_workers = 1
+        processor.max_edge = 800
+        _, image_bytes = processor.pdf_to_images(self.pdf_path)[0]
+        
+        pix = fitz.Pixmap(image_bytes)
+        self.assertLessEqual(max(pix.width, pix.height), 800)
+        self.assertGreater(max(pix.width, pix.height), 790)
+    
+    def test_get_pdf_info_reparses_only_changed_files(self):
+        """Test PDF info is cached until the file on disk changes"""
+        import fitz
+        
+        processor = PDFProcessor()
+        longer_pdf = make_pdf_bytes(pages=5)
+        with patch('analyzer.utils.pdf_processor.fitz.open', wraps=fitz.open) as mock_open:
+            self.assertEqual(processor.get_pdf_info(self.pdf_path)['page_count'], 3)
+            self.assertEqual(processor.get_pdf_info(self.pdf_path)['page_count'], 3)
+            self.assertEqual(mock_open.call_count, 1)
+            
+            with open(self.pdf_path, 'wb') as pdf_file:
+                pdf_file.write(longer_pdf)
+            self.assertEqual(processor.get_pdf_info(self.pdf_path)['page_count'], 5)
+            self.assertEqual(mock_open.call_count, 2)
+    
+    def test_clamp_bounding_boxes_matches_page_bounds(self):
+        """Test boxes are clamped to the page and grown to the minimum crop size"""
+        boxes = _clamp_bounding_boxes(
+            [[-10, 5.7, 300, 900], [100, 100, 110, 120], [580, 380, 700, 390]], 600, 400
+        )
+        
+        self.assertEqual(boxes.tolist(), [[0, 5, 300, 400], [100, 100, 150, 150], [580, 380, 600, 400]])
+    
+    def test_process_detection_results_mixed_schemas(self):
+        """Test detections that don't match the first one's field names are still read"""
+        extractor = TableExtractor()
+        tables = extractor._process_detection_results([
+            {'score': 0.9, 'label': 'table', 'box': [1, 2, 3, 4]},
+            {'confidence_score': 0.8, 'class': 'table rotated', 'bounding_box': [5, 6, 7, 8]},
+            {'score': 0.1, 'label': 'table', 'box': [9, 9, 9, 9]},
+        ])
+        
+        self.assertEqual(tables, [
+            {'bounding_box': [1, 2, 3, 4], 'confidence_score': 0.9, 'label': 'table'},
+            {'bounding_box': [5, 6, 7, 8], 'confidence_score': 0.8, 'label': 'table rotated'},
+        ])
+    
+    def test_process_structure_results_unwraps_deeply_nested_lists(self):
+        """Test nested result lists are unwrapped without recursing per level"""
+        extractor = TableExtractor()
+        structure = {'rows': [], 'columns': []}
+        nested = structure
+        for _ in range(5000):
+            nested = [nested]
+        
+        self.assertIs(extractor._process_structure_results(nested), structure)
+        self.assertEqual(extractor._process_structure_results([[]])['raw_results'], [])
+    
+    def test_crop_tables_stay_off_the_render_pool(self):
+        """Test crops are made inline rather than queued behind read-ahead render runs"""
+        extractor = TableExtractor()
+        extractor.pdf_processor.render_workers = 1
+        page_images = extractor.pdf_processor.pdf_to_images(self.pdf_path)
+        page_detections = {page_num: extractor._process_detection_results(self.DETECTIONS)
+                           for page_num, _ in page_images}
+        
+        extractor.pdf_processor.render_workers = 2
+        with patch.object(PDFProcessor, '_get_executor') as mock_get_executor:
+            crops = extractor._crop_tables_batch(page_images, page_detections)
+        
+        mock_get_executor.assert_not_called()
+        self.assertEqual([key for key, _ in crops], [(1, 0), (1, 1), (2, 0), (2, 1), (3, 0), (3, 1)])
+    
+    def fake_query_model(self, client, model_name, inputs, *args, **kwargs):
+        self.queried_models.append(model_name)
+        if model_name in client.STRUCTURE_MODELS:
+            self.structure_inputs.append(inputs)
+        if model_name == 'TahaDouaji/detr-doc-table-detection':
+            return None
+        if model_name in client.DETECTION_MODELS:
+            return self.DETECTIONS
+        return [{'score': 0.7}]
+    
+    def test_extract_tables_batches_model_cascade(self):
+        """Test a model that fails is not retried for every page of the batch"""
+        extractor = TableExtractor()
+        with patch.object(extractor.hf_client, 'query_model',
+                          side_effect=lambda *a, **k: self.fake_query_model(extractor.hf_client, *a, **k)):
+            result = extractor.extract_tables_from_pdf(self.pdf_path)
+        
+        self.assertEqual(result['total_pages'], 3)
+        self.assertEqual(result['pages_processed'], 3)
+        self.assertEqual(len(result['tables']), 6)
+        self.assertEqual(result['tables'][1]['bounding_box'], [10, 300, 300, 500])
+        self.assertEqual(self.queried_models.count('TahaDouaji/detr-doc-table-detection'), 1)
+        # Structure recognition sees each table's crop rather than the full page
+        crops = [Image.open(io.BytesIO(image_bytes)) for image_bytes in self.structure_inputs]
+        self.assertEqual({crop.size for crop in crops}, {(290, 180), (290, 200)})
+        self.assertEqual({crop.format for crop in crops}, {'JPEG'})
+    
+    def test_extract_tables_in_page_runs_reuses_resolved_model(self):
+        """Test pages streamed in runs give the same tables without re-resolving the cascade"""
+        extractor = TableExtractor()
+        extractor.pages_per_run = 1
+        extractor.pdf_processor.render_workers = 2
+        with patch.object(extractor.hf_client, 'query_model',
+                          side_effect=lambda *a, **k: self.fake_query_model(extractor.hf_client, *a, **k)):
+            result = extractor.extract_tables_from_pdf(self.pdf_path)
+        
+        self.assertEqual(result['total_pages'], 3)
+        self.assertEqual([table['page_number'] for table in result['tables']], [1, 1, 2, 2, 3, 3])
+        self.assertEqual(self.queried_models.count('TahaDouaji/detr-doc-table-detection'), 1)
+    
+    def test_extract_tables_reports_progress_per_run(self):
+        """Test the progress callback fires once per run of pages"""
+        extractor = TableExtractor()
+        extractor.pages_per_run = 1
+        extractor.pdf_processor.render_workers = 1
+        on_progress = MagicMock()
+        with patch.object(extractor.hf_client, 'query_model',
+                          side_effect=lambda *a, **k: self.fake_query_model(extractor.hf_client, *a, **k)):
+            extractor.extract_tables_from_pdf(self.pdf_path, on_progress=on_progress)
+        
+        self.assertEqual(on_progress.call_count, 3)
+    
+    def test_resolved_model_is_scoped_to_one_document(self):
+        """Test a shared extractor resolves the cascade again for each PDF"""
+        extractor = TableExtractor()
+        extractor.pdf_processor.render_workers = 1
+        with patch.object(extractor.hf_client, 'query_model',
+                          side_effect=lambda *a, **k: self.fake_query_model(extractor.hf_client, *a, **k)):
+            extractor.extract_tables_from_pdf(self.pdf_path)
+            extractor.extract_tables_from_pdf(self.pdf_path)
+        
+        self.assertEqual(self.queried_models.count('TahaDouaji/detr-doc-table-detection'), 2)
+
+
+
+@override_settings(HUGGINGFACE_RATE_LIMIT=0, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'inference': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'inference-tests'},
+})
+class HuggingFaceClientTest(TestCase):
+    """Test cases for the Hugging Face API client"""
+    
+    def setUp(self):
+        caches['inference'].clear()
+        _local_responses.clear()
+        self.client = HuggingFaceClient()
+        sleep_patcher = patch('analyzer.utils.huggingface_client.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def mock_response(self, status_code=200, payload=None):
+        payload = payload if payload is not None else [{'score': 0.9, 'label': 'table'}]
+        return MagicMock(status_code=status_code, content=json.dumps(payload).encode(), text='', headers={})
+    
+    def test_query_model_caches_image_responses(self):
+        """Test identical image bytes are only sent to a model once"""
+        with patch.object(self.client.session, 'post', return_value=self.mock_response()) as mock_post:
+            first = self.client.query_model('some/model', b'image bytes')
+            second = self.client.query_model('some/model', b'image bytes')
+            self.client.query_model('other/model', b'image bytes')
+        
+        self.assertEqual(first, second)
+        self.assertEqual(mock_post.call_count, 2)
+    
+    def test_query_model_serves_repeats_from_memory(self):
+        """Test a response seen in this process skips the shared cache backend"""
+        with patch.object(self.client.session, 'post', return_value=self.mock_response()):
+            first = self.client.query_model('some/model', b'image bytes')
+        
+        with patch.object(self.client.cache, 'get') as mock_get:
+            self.assertEqual(self.client.query_model('some/model', b'image bytes'), first)
+        mock_get.assert_not_called()
+    
+    def test_query_model_read_only_cache_mode(self):
+        """Test read_only mode serves cached responses but never stores new ones"""
+        caches['inference'].set(f"hf:some/model:{hashlib.sha256(b'cached').hexdigest()}", ['hit'])
+        with override_settings(HUGGINGFACE_CACHE_MODE='read_only'):
+            client = HuggingFaceClient()
+        
+        with patch.object(client.session, 'post', return_value=self.mock_response()) as mock_post:
+            self.assertEqual(client.query_model('some/model', b'cached'), ['hit'])
+            client.query_model('some/model', b'image bytes')
+            client.query_model('some/model', b'image bytes')
+        
+        self.assertEqual(mock_post.call_count, 2)
+    
+    def test_query_model_leaves_retries_to_session(self):
+        """Test an exhausted 503 is posted once and not cached"""
+        with patch.object(self.client.session, 'post', return_value=self.mock_response(503)) as mock_post:
+            self.assertIsNone(self.client.query_model('some/model', b'image bytes'))
+        
+        self.assertEqual(mock_post.call_count, 1)
+        retry = self.client.session.get_adapter(self.client.base_url).max_retries
+        self.assertIn(503, retry.status_forcelist)
+        self.assertIn('POST', retry.allowed_methods)
+    
+    def test_clients_share_session_and_send_credentials_per_request(self):
+        """Test a new client reuses the pooled session and still authenticates"""
+        other_client = HuggingFaceClient()
+        self.assertIs(other_client.session, self.client.session)
+        
+        with patch.object(other_client.session, 'post', return_value=self.mock_response()) as mock_post:
+            other_client.query_model('some/model', b'image bytes')
+        
+        self.assertIn('Authorization', mock_post.call_args.kwargs['headers'])
+        self.assertNotIn('Authorization', other_client.session.headers)
+    
+    def test_retry_backoff_is_jittered_below_exponential_cap(self):
+        """Test retry sleeps are drawn from zero up to the exponential backoff"""
+        retry = self.client.session.get_adapter(self.client.base_url).max_retries
+        for _ in range(3):
+            retry = retry.increment(method='POST', url='/models/some/model', response=HTTPResponse(status=503))
+        
+        with patch('analyzer.utils.huggingface_client.random.uniform', return_value=1.5) as mock_uniform:
+            self.assertEqual(retry.get_backoff_time(), 1.5)
+        # Third consecutive error: backoff_factor * 2 ** 2
+        mock_uniform.assert_called_once_with(0, 20)
+    
+    def test_requests_share_process_wide_concurrency_cap(self):
+        """Test concurrent batches never exceed the shared in-flight request limit"""
+        state = {'active': 0, 'peak': 0}
+        lock = threading.Lock()
+        
+        def slow_post(*args, **kwargs):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            threading.Event().wait(0.02)
+            with lock:
+                state['active'] -= 1
+            return self.mock_response()
+        
+        images = [f'image {index}'.encode() for index in range(6)]
+        with patch('analyzer.utils.huggingface_client._request_slots', threading.BoundedSemaphore(2)), \
+                patch.object(self.client.session, 'post', side_effect=slow_post):
+            results = self.client._query_models_batch(['some/model'], images, 'detection')
+        
+        self.assertEqual(len(results), 6)
+        self.assertLessEqual(state['peak'], 2)
+    
+    def test_batch_sends_duplicate_pages_once(self):
+        """Test identical page images in a batch share one request"""
+        images = [b'blank page', b'table page', b'blank page']
+        with patch.object(self.client.session, 'post', return_value=self.mock_response()) as mock_post:
+            results = self.client._query_models_batch(['some/model'], images, 'detection')
+        
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], results[2])
+    
+    def test_first_page_races_top_models(self):
+        """Test a slow head-of-cascade model doesn't delay the batch"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        
+        def post(url, *args, **kwargs):
+            if url.endswith('/slow/model'):
+                release.wait(5)
+            return self.mock_response()
+        
+        with patch.object(self.client.session, 'post', side_effect=post):
+            results = self.client._query_models_batch(['slow/model', 'fast/model'], [b'page 1', b'page 2'], 'detection')
+        
+        self.assertEqual([model_name for model_name, _ in results], ['fast/model', 'fast/model'])
+        self.assertFalse(release.is_set())
+    
+    def test_race_tie_goes_to_higher_ranked_model(self):
+        """Test racers finishing together resolve to the first model in the cascade"""
+        from concurrent.futures import Future
+        
+        def submit(fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+        
+        executor = MagicMock()
+        executor.submit.side_effect = submit
+        for models in (['a/model', 'b/model'], ['b/model', 'a/model']):
+            with patch('analyzer.utils.huggingface_client._get_request_executor', return_value=executor), \
+                    patch.object(self.client, '_try_model', side_effect=lambda name, *args: {'model': name}):
+                model_name, _ = self.client._race_cascade(models, b'page', 'detection')
+            self.assertEqual(model_name, models[0])
+    
+    def test_normalize_detection_results_filters_low_scoring_non_tables(self):
+        """Test box formats are unified and only tables or confident detections are kept"""
+        normalized = self.client._normalize_detection_results([
+            {'score': 0.2, 'label': 'Table', 'box': {'xmin': 1, 'ymin': 2, 'xmax': 3, 'ymax': 4}},
+            {'confidence': 0.9, 'label': 'figure', 'bbox': [5, 6, 7, 8]},
+            {'score': 0.1, 'label': 'figure', 'bbox': [0, 0, 1, 1]},
+            {'score': 0.9, 'label': 'table'},
+        ], 'some/model')
+        
+        self.assertEqual(normalized['detections'], [
+            {'bounding_box': [1, 2, 3, 4], 'confidence_score': 0.2, 'label': 'Table'},
+            {'bounding_box': [5, 6, 7, 8], 'confidence_score': 0.9, 'label': 'figure'},
+        ])
+    
+    def test_token_bucket_allows_burst_then_paces(self):
+        """Test the rate limiter only waits once the burst is spent"""
+        clock = {'now': 100.0}
+        
+        def fake_sleep(seconds):
+            clock['now'] += seconds
+        
+        with patch('analyzer.utils.huggingface_client.time.monotonic', side_effect=lambda: clock['now']), \
+                patch('analyzer.utils.huggingface_client.time.sleep', side_effect=fake_sleep) as mock_sleep:
+            bucket = TokenBucket(rate=2.0, capacity=3)
+            for _ in range(3):
+                bucket.acquire()
+            self.assertEqual(mock_sleep.call_count, 0)
+            
+            bucket.acquire()
+        
+        mock_sleep.assert_called_once_with(0.5)
+        self.assertEqual(clock['now'], 100.5)
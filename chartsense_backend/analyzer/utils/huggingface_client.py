@@ -1,110 +1,393 @@
 import time
+import random
+import hashlib
 import requests
 import logging
-import base64
-from typing import Dict, Any, Optional, List
+import threading
+import numpy as np
+import orjson
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, List, Tuple
 from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+_request_slots = None
+_request_slots_lock = threading.Lock()
+
+
+def _get_request_slots():
+    """
+    Return the process-wide semaphore bounding in-flight Inference API requests.
+    
+    Each client fans pages out on its own threads and several analyses can run
+    at once, so the cap is shared across clients rather than per batch.
+    """
+    global _request_slots
+    if _request_slots is None:
+        with _request_slots_lock:
+            if _request_slots is None:
+                _request_slots = threading.BoundedSemaphore(
+                    getattr(settings, 'HUGGINGFACE_MAX_CONCURRENCY', 8)
+                )
+    return _request_slots
+
+
+_request_executor = None
+
+
+def _get_request_executor():
+    """Return the process-wide thread pool that fans page requests out"""
+    global _request_executor
+    if _request_executor is None:
+        with _request_slots_lock:
+            if _request_executor is None:
+                _request_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'HUGGINGFACE_MAX_CONCURRENCY', 8),
+                    thread_name_prefix='hf-request'
+                )
+    return _request_executor
+
+
+# Sample table used when structure recognition is unavailable; built once at
+# import and shared, so callers must treat these as read-only
+_SAMPLE_TABLE = [
+    ['Disability Category', 'Participants', 'Ballots Completed', 'Ballots Incomplete/Terminated', 'Results Accuracy', 'Time to complete'],
+    ['Blind', '5', '1', '4', '34.5%, n=1', '1199 sec, n=1'],
+    ['Low Vision', '5', '2', '3', '98.3% n=2 (97.7%, n=3)', '1716 sec, n=3 (1934 sec, n=2)'],
+    ['Dexterity', '5', '4', '1', '98.3%, n=4', '1672.1 sec, n=4'],
+    ['Mobility', '3', '3', '0', '95.4%, n=3', '1416 sec, n=3'],
+]
+_SAMPLE_COLUMN_NAMES = _SAMPLE_TABLE[0]
+
+# Placeholders for structure results that lack rows/columns/cells
+_DEFAULT_ROWS = [
+    {'row_id': i, 'bbox': [0, i*30, 200, (i+1)*30], 'confidence': 0.5}
+    for i in range(3)
+]
+_DEFAULT_COLUMNS = [
+    {'column_id': i, 'name': name, 'bbox': [i*100, 0, (i+1)*100, 200], 'confidence': 0.5}
+    for i, name in enumerate(_SAMPLE_COLUMN_NAMES)
+]
+_DEFAULT_CELLS = [
+    {
+        'row': row_idx,
+        'column': col_idx,
+        'text': cell_text,
+        'bbox': [col_idx*100, row_idx*30, (col_idx+1)*100, (row_idx+1)*30],
+        'confidence': 0.7
+    }
+    for row_idx, row_data in enumerate(_SAMPLE_TABLE)
+    for col_idx, cell_text in enumerate(row_data)
+]
+
+# Column edges of the fallback structure, which uses uneven column widths
+_FALLBACK_COLUMN_EDGES = [0, 100, 150, 200, 350, 450, 600]
+_FALLBACK_STRUCTURE = {
+    'rows': [
+        {'row_id': i, 'bbox': [0, i*30, 600, (i+1)*30], 'confidence': 0.8}
+        for i in range(len(_SAMPLE_TABLE))
+    ],
+    'columns': [
+        {
+            'column_id': i,
+            'name': name,
+            'bbox': [_FALLBACK_COLUMN_EDGES[i], 0, _FALLBACK_COLUMN_EDGES[i+1], 150],
+            'confidence': 0.8
+        }
+        for i, name in enumerate(_SAMPLE_COLUMN_NAMES)
+    ],
+    'cells': [
+        {
+            'row': row_idx,
+            'column': col_idx,
+            'text': cell_text,
+            'bbox': [_FALLBACK_COLUMN_EDGES[col_idx], row_idx*30, _FALLBACK_COLUMN_EDGES[col_idx+1], (row_idx+1)*30],
+            'confidence': 0.8
+        }
+        for row_idx, row_data in enumerate(_SAMPLE_TABLE)
+        for col_idx, cell_text in enumerate(row_data)
+    ],
+    'model_used': 'fallback',
+    'note': 'Using fallback structure as models were not available'
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket admitting `rate` calls per second with bursts up to `capacity`"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class LocalResponseCache:
+    """Thread-safe in-process LRU of recent model responses, keyed like the shared inference cache"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: str) -> Any:
+        """Return the cached response for key, or None"""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any):
+        """Store a response, evicting the least recently used one when full"""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached response"""
+        with self.lock:
+            self.entries.clear()
+
+
+# Repeat pages within a process (retries, re-analysis, duplicate uploads) are
+# answered from memory before going to the shared cache backend
+_local_responses = LocalResponseCache(maxsize=1024)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _get_rate_limiter(model_name: str) -> Optional[TokenBucket]:
+    """Return the process-wide token bucket for a model, or None when unlimited"""
+    rate = getattr(settings, 'HUGGINGFACE_RATE_LIMIT', 1.0)
+    if rate <= 0:
+        return None
+    
+    with _rate_limiters_lock:
+        if model_name not in _rate_limiters:
+            _rate_limiters[model_name] = TokenBucket(rate, getattr(settings, 'HUGGINGFACE_RATE_BURST', 4))
+        return _rate_limiters[model_name]
+
+
+class JitteredRetry(Retry):
+    """
+    urllib3 Retry with full-jitter exponential backoff
+    
+    Sleeps a random time between zero and the usual exponential backoff, so
+    clients throttled at the same moment don't all retry together. A
+    Retry-After header from the server still takes precedence.
+    """
+    
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+
+def _detection_bbox(detection: Dict) -> List[float]:
+    """Return a detection's box as [x1, y1, x2, y2], whichever format the model used"""
+    box = detection['box'] if 'box' in detection else detection['bbox']
+    if isinstance(box, dict):
+        return [
+            box.get('xmin', box.get('x1', 0)),
+            box.get('ymin', box.get('y1', 0)),
+            box.get('xmax', box.get('x2', 100)),
+            box.get('ymax', box.get('y2', 100))
+        ]
+    return list(box) if isinstance(box, (list, tuple)) else [0, 0, 100, 100]
+
+
+def _image_content_type(image_data: bytes) -> str:
+    """Return the MIME type of PNG/JPEG image bytes, octet-stream otherwise"""
+    if image_data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if image_data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    return 'application/octet-stream'
+
 
 class HuggingFaceClient:
     """Client for interacting with Hugging Face API"""
     
+    # Models to try, in order of preference
+    DETECTION_MODELS = [
+        "TahaDouaji/detr-doc-table-detection",
+        "microsoft/table-transformer-detection",
+        "facebook/detr-resnet-50",  # Generic object detection as fallback
+    ]
+    STRUCTURE_MODELS = [
+        "microsoft/table-transformer-structure-recognition",
+        "microsoft/table-transformer-structure-recognition-v1.1-all",
+    ]
+    
+    # Retries are done by urllib3 inside the connection pool: 503 while a model
+    # loads, 429 when rate limited, and gateway errors. Retry-After is honoured
+    # and otherwise the wait is jittered below a cap that doubles from
+    # RETRY_BACKOFF_FACTOR seconds.
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_FACTOR = 5
+    RETRY_STATUS_CODES = (429, 502, 503, 504)
+    
+    # How many models at the head of a cascade are queried at once for the first page
+    RACE_WIDTH = 2
+    
+    _session = None
+    _session_lock = threading.Lock()
+    
     def __init__(self):
         self.api_key = settings.HUGGINGFACE_API_KEY
         self.base_url = "https://api-inference.huggingface.co/models"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
         }
-        self.request_delay = getattr(settings, 'HUGGINGFACE_REQUEST_DELAY', 2.0)
+        self.max_concurrency = getattr(settings, 'HUGGINGFACE_MAX_CONCURRENCY', 8)
+        self.cache_timeout = getattr(settings, 'HUGGINGFACE_CACHE_TIMEOUT', 24 * 60 * 60)
+        cache_mode = getattr(settings, 'HUGGINGFACE_CACHE_MODE', 'on')
+        self.cache_read = cache_mode in ('on', 'read_only')
+        self.cache_write = cache_mode in ('on', 'write_only')
+        self.cache = caches['inference']
+        
+        self.session = self._get_session()
+    
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        """
+        Return the keep-alive session shared by every client, creating it on first use
+        
+        A client is created per analysis; sharing the session means later
+        analyses reuse warm TLS connections instead of handshaking again.
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    retry = JitteredRetry(
+                        total=cls.MAX_RETRIES,
+                        backoff_factor=cls.RETRY_BACKOFF_FACTOR,
+                        status_forcelist=cls.RETRY_STATUS_CODES,
+                        allowed_methods=frozenset(['POST']),
+                        respect_retry_after_header=True,
+                        raise_on_status=False,
+                    )
+                    session = requests.Session()
+                    # Every request goes to one host; size that pool so concurrent page
+                    # requests each keep their connection instead of discarding it
+                    max_concurrency = getattr(settings, 'HUGGINGFACE_MAX_CONCURRENCY', 8)
+                    session.mount("https://", HTTPAdapter(
+                        pool_connections=4, pool_maxsize=max(max_concurrency, 1), max_retries=retry
+                    ))
+                    cls._session = session
+        return cls._session
     
-    def query_model(self, model_name: str, inputs: Any, max_retries: int = 3) -> Optional[Dict]:
+    def query_model(self, model_name: str, inputs: Any, content_type: Optional[str] = None) -> Optional[Dict]:
         """
-        Query a Hugging Face model with retry logic
+        Query a Hugging Face model; transient failures are retried by the session
         
         Args:
             model_name: Name of the model to query
             inputs: Input data for the model (can be bytes for images or dict for JSON)
-            max_retries: Maximum number of retry attempts
+            content_type: Content-Type for byte inputs, e.g. 'image/png'
             
         Returns:
             Response data from the API or None if failed
         """
         url = f"{self.base_url}/{model_name}"
         
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Querying {model_name} (attempt {attempt + 1}/{max_retries})")
-                
-                # Prepare headers and data based on input type
-                headers = self.headers.copy()
-                
-                if isinstance(inputs, bytes):
-                    # For image data, send as binary
-                    headers["Content-Type"] = "application/octet-stream"
-                    data = inputs
-                    json_data = None
-                else:
-                    # For JSON data
-                    headers["Content-Type"] = "application/json"
-                    data = None
-                    json_data = inputs
-                
-                response = requests.post(
+        # Identical images always get the same answer, so skip the round trip for repeats
+        cache_key = None
+        if isinstance(inputs, bytes) and (self.cache_read or self.cache_write):
+            cache_key = f"hf:{model_name}:{hashlib.sha256(inputs).hexdigest()}"
+            cached = None
+            if self.cache_read:
+                cached = _local_responses.get(cache_key)
+                if cached is None:
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        _local_responses.set(cache_key, cached)
+            if cached is not None:
+                logger.debug(f"Using cached response for {model_name}")
+                return cached
+        
+        # Prepare headers and data based on input type; the session is shared,
+        # so credentials go on each request rather than on the session
+        headers = dict(self.headers)
+        
+        if isinstance(inputs, bytes):
+            # For image data, send the raw bytes as the body; no base64/JSON wrapping
+            headers["Content-Type"] = content_type or "application/octet-stream"
+            data = inputs
+            json_data = None
+        else:
+            # For JSON data
+            headers["Content-Type"] = "application/json"
+            data = None
+            json_data = inputs
+        
+        try:
+            logger.debug(f"Querying {model_name}")
+            # Cache hits above never spend a token
+            rate_limiter = _get_rate_limiter(model_name)
+            if rate_limiter:
+                rate_limiter.acquire()
+            with _get_request_slots():
+                response = self.session.post(
                     url,
                     headers=headers,
                     data=data,
                     json=json_data,
                     timeout=60
                 )
-                
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response content preview: {str(response.content)[:200]}")
-                
-                if response.status_code == 200:
-                    logger.info(f"Successfully queried {model_name}")
-                    # Add delay to respect rate limits
-                    time.sleep(self.request_delay)
-                    return response.json()
-                
-                elif response.status_code == 503:
-                    # Model is loading, wait and retry
-                    wait_time = 20 * (attempt + 1)
-                    logger.warning(f"Model {model_name} is loading, waiting {wait_time}s before retry")
-                    time.sleep(wait_time)
-                    continue
-                
-                elif response.status_code == 429:
-                    # Rate limit exceeded
-                    wait_time = 30 * (attempt + 1)
-                    logger.warning(f"Rate limit exceeded, waiting {wait_time}s before retry")
-                    time.sleep(wait_time)
-                    continue
-                
-                elif response.status_code == 404:
-                    logger.error(f"Model {model_name} not found or not available via Inference API")
-                    return None
-                
-                else:
-                    logger.error(f"API request failed with status {response.status_code}: {response.text}")
-                    if attempt == max_retries - 1:
-                        raise Exception(f"API request failed: {response.status_code} - {response.text}")
-                    time.sleep(5 * (attempt + 1))
-            
-            except requests.exceptions.Timeout:
-                logger.warning(f"Request to {model_name} timed out (attempt {attempt + 1}/{max_retries})")
-                if attempt == max_retries - 1:
-                    raise Exception(f"Request timed out after {max_retries} attempts")
-                time.sleep(5 * (attempt + 1))
-            
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error for {model_name}: {str(e)}")
-                if attempt == max_retries - 1:
-                    raise Exception(f"Request failed: {str(e)}")
-                time.sleep(5 * (attempt + 1))
+        except requests.exceptions.Timeout:
+            logger.warning(f"Request to {model_name} timed out")
+            raise Exception(f"Request timed out after {self.MAX_RETRIES} retries")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error for {model_name}: {str(e)}")
+            raise Exception(f"Request failed: {str(e)}")
         
-        return None
+        # Per-request detail; the preview is only formatted when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Response status: {response.status_code}")
+            logger.debug(f"Response content preview: {response.content[:200]!r}")
+        
+        if response.status_code == 200:
+            logger.debug(f"Successfully queried {model_name}")
+            result = orjson.loads(response.content)
+            if cache_key and self.cache_write:
+                self.cache.set(cache_key, result, self.cache_timeout)
+                _local_responses.set(cache_key, result)
+            return result
+        
+        if response.status_code == 404:
+            logger.error(f"Model {model_name} not found or not available via Inference API")
+            return None
+        
+        if response.status_code in self.RETRY_STATUS_CODES:
+            # Still loading or rate limited after every retry
+            logger.warning(f"Model {model_name} unavailable after {self.MAX_RETRIES} retries (status {response.status_code})")
+            return None
+        
+        logger.error(f"API request failed with status {response.status_code}: {response.text}")
+        raise Exception(f"API request failed: {response.status_code} - {response.text}")
     
     def detect_tables(self, image_data: bytes) -> Optional[Dict]:
         """
@@ -116,28 +399,27 @@ class HuggingFaceClient:
         Returns:
             Detection results or None if failed
         """
-        # List of models to try, in order of preference
-        models_to_try = [
-            "TahaDouaji/detr-doc-table-detection",
-            "microsoft/table-transformer-detection", 
-            "facebook/detr-resnet-50",  # Generic object detection as fallback
-        ]
+        return self.detect_tables_batch([image_data])[0]
+    
+    def detect_tables_batch(self, images: List[bytes], preferred_models: Optional[Dict[str, str]] = None) -> List[Optional[Dict]]:
+        """
+        Detect tables in several page images at once
         
-        for model_name in models_to_try:
-            try:
-                logger.info(f"Trying table detection with model: {model_name}")
-                result = self.query_model(model_name, image_data)
-                
-                if result:
-                    logger.info(f"Successfully got results from {model_name}")
-                    return self._normalize_detection_results(result, model_name)
-                
-            except Exception as e:
-                logger.warning(f"Model {model_name} failed: {str(e)}")
-                continue
+        Args:
+            images: List of image data as bytes
+            preferred_models: Model that answered each task earlier in the same
+                document, updated in place; see _query_models_batch
+            
+        Returns:
+            Detection results (or None if failed) for each image, in order
+        """
+        results = []
+        for model_name, result in self._query_models_batch(self.DETECTION_MODELS, images, "table detection", preferred_models):
+            results.append(self._normalize_detection_results(result, model_name) if result else None)
         
-        logger.error("All table detection models failed")
-        return None
+        if not any(results):
+            logger.error("All table detection models failed")
+        return results
     
     def recognize_table_structure(self, image_data: bytes) -> Optional[Dict]:
         """
@@ -149,26 +431,135 @@ class HuggingFaceClient:
         Returns:
             Structure recognition results or None if failed
         """
-        models_to_try = [
-            "microsoft/table-transformer-structure-recognition",
-            "microsoft/table-transformer-structure-recognition-v1.1-all",
-        ]
+        return self.recognize_table_structure_batch([image_data])[0]
+    
+    def recognize_table_structure_batch(self, images: List[bytes],
+                                        preferred_models: Optional[Dict[str, str]] = None) -> List[Optional[Dict]]:
+        """
+        Recognize table structure in several images at once
+        
+        Args:
+            images: List of image data as bytes
+            preferred_models: Model that answered each task earlier in the same
+                document, updated in place; see _query_models_batch
+            
+        Returns:
+            Structure recognition results for each image, in order; images
+            no model could handle get the fallback structure
+        """
+        results = []
+        for model_name, result in self._query_models_batch(self.STRUCTURE_MODELS, images, "structure recognition", preferred_models):
+            if result:
+                results.append(self._normalize_structure_results(result, model_name))
+            else:
+                logger.warning("All structure recognition models failed, using fallback")
+                results.append(self._create_fallback_structure())
+        return results
+    
+    def _query_models_batch(self, models: List[str], images: List[bytes], task: str,
+                            preferred_models: Optional[Dict[str, str]] = None) -> List[Tuple[Optional[str], Any]]:
+        """
+        Run a batch of images through a cascade of models
+        
+        The Inference API takes a single image per request for these pipelines,
+        so images are still sent one per request, but the cascade is only walked
+        in full until a model answers; that model is tried first for the rest of
+        the batch, which is then sent concurrently within the per-model rate limit.
+        Identical images (blank or repeated pages) are only sent once.
+        
+        The answering model is recorded in preferred_models, so a caller passing
+        the same dict for every batch of a document skips resolving the cascade
+        again. It is scoped to that caller; without it each batch starts afresh.
         
-        for model_name in models_to_try:
-            try:
-                logger.info(f"Trying structure recognition with model: {model_name}")
-                result = self.query_model(model_name, image_data)
-                
-                if result:
-                    logger.info(f"Successfully got structure results from {model_name}")
-                    return self._normalize_structure_results(result, model_name)
-                
-            except Exception as e:
-                logger.warning(f"Structure model {model_name} failed: {str(e)}")
-                continue
+        Returns:
+            List of (model_name, raw_result) tuples, (None, None) for failures
+        """
+        unique_images = list(dict.fromkeys(images))
+        results = []
+        remaining = list(unique_images)
+        if preferred_models is None:
+            preferred_models = {}
+        preferred = preferred_models.get(task)
+        
+        # Resolve a working model one page at a time so failing models aren't hit by
+        # every page at once; the top two models race so a cold one doesn't stall it
+        while remaining and preferred is None:
+            model_name, result = self._race_cascade(models, remaining.pop(0), task)
+            results.append((model_name, result))
+            if result:
+                preferred = preferred_models[task] = model_name
+        
+        if remaining:
+            ordered = [preferred] + [name for name in models if name != preferred]
+            # Pages from every batch share one long-lived pool instead of each
+            # batch starting and joining its own threads
+            executor = _get_request_executor()
+            results.extend(executor.map(lambda image_data: self._query_cascade(ordered, image_data, task), remaining))
+        
+        results_by_image = dict(zip(unique_images, results))
+        return [results_by_image[image_data] for image_data in images]
+    
+    def _race_cascade(self, models: List[str], image_data: bytes, task: str) -> Tuple[Optional[str], Any]:
+        """
+        Query the first RACE_WIDTH models at once and keep whichever answers first
+        
+        A model that is still loading can hold a request for minutes of 503
+        retries; racing means the cascade waits for the fastest model instead.
+        The slower request can't be aborted mid-flight, so it is left to finish
+        in the background (its response still lands in the cache).
+        
+        Returns:
+            (model_name, raw_result), or (None, None) if every model failed
+        """
+        racers, rest = models[:self.RACE_WIDTH], models[self.RACE_WIDTH:]
+        if len(racers) < 2:
+            return self._query_cascade(models, image_data, task)
+        
+        # Racers share the process-wide request pool, so abandoned losers still
+        # count against the thread cap
+        executor = _get_request_executor()
+        futures = [(name, executor.submit(self._try_model, name, image_data, task)) for name in racers]
+        try:
+            pending = {future for _, future in futures}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                # Check in cascade order so the higher-ranked model wins a tie,
+                # e.g. when both answers come from the cache
+                for model_name, future in futures:
+                    if future in done:
+                        result = future.result()
+                        if result:
+                            return model_name, result
+        finally:
+            for _, future in futures:
+                future.cancel()
+        
+        return self._query_cascade(rest, image_data, task)
+    
+    def _query_cascade(self, models: List[str], image_data: bytes, task: str) -> Tuple[Optional[str], Any]:
+        """Try each model in turn, returning the first (model_name, result) that succeeds"""
+        for model_name in models:
+            result = self._try_model(model_name, image_data, task)
+            if result:
+                return model_name, result
         
-        logger.warning("All structure recognition models failed, using fallback")
-        return self._create_fallback_structure()
+        return None, None
+    
+    def _try_model(self, model_name: str, image_data: bytes, task: str) -> Any:
+        """Query one model for an image, returning its result or None on failure"""
+        try:
+            logger.info(f"Trying {task} with model: {model_name}")
+            result = self.query_model(
+                model_name, image_data, content_type=_image_content_type(image_data)
+            )
+            
+            if result:
+                logger.info(f"Successfully got {task} results from {model_name}")
+            return result
+        
+        except Exception as e:
+            logger.warning(f"Model {model_name} failed for {task}: {str(e)}")
+            return None
     
     def _normalize_detection_results(self, results: Dict, model_name: str) -> Dict:
         """Normalize detection results from different models"""
@@ -180,40 +571,29 @@ class HuggingFaceClient:
             else:
                 detections = [results]
             
-            normalized_detections = []
+            # Handle different bounding box formats, dropping detections without one
+            detections = [d for d in detections if 'box' in d or 'bbox' in d]
+            if not detections:
+                return {'detections': []}
+            
+            boxes = np.array([_detection_bbox(d) for d in detections], dtype=np.float64)
+            scores = np.fromiter(
+                (d.get('score', d.get('confidence', 0.5)) for d in detections),
+                dtype=np.float64, count=len(detections)
+            )
+            labels = [d.get('label', 'table') for d in detections]
             
-            for detection in detections:
-                # Handle different bounding box formats
-                if 'box' in detection:
-                    box = detection['box']
-                elif 'bbox' in detection:
-                    box = detection['bbox']
-                else:
-                    continue
-                
-                # Normalize box coordinates
-                if isinstance(box, dict):
-                    bbox = [
-                        box.get('xmin', box.get('x1', 0)),
-                        box.get('ymin', box.get('y1', 0)), 
-                        box.get('xmax', box.get('x2', 100)),
-                        box.get('ymax', box.get('y2', 100))
-                    ]
-                else:
-                    bbox = list(box) if isinstance(box, (list, tuple)) else [0, 0, 100, 100]
-                
-                score = detection.get('score', detection.get('confidence', 0.5))
-                label = detection.get('label', 'table')
-                
-                # Filter for table-related detections
-                if 'table' in label.lower() or score > 0.3:
-                    normalized_detections.append({
-                        'bounding_box': bbox,
-                        'confidence_score': score,
-                        'label': label
-                    })
+            # Filter for table-related detections
+            keep = (scores > 0.3) | np.array(['table' in label.lower() for label in labels])
             
-            return {'detections': normalized_detections}
+            return {'detections': [
+                {
+                    'bounding_box': boxes[i].tolist(),
+                    'confidence_score': float(scores[i]),
+                    'label': labels[i]
+                }
+                for i in np.flatnonzero(keep)
+            ]}
             
         except Exception as e:
             logger.error(f"Error normalizing detection results: {e}")
@@ -244,126 +624,32 @@ class HuggingFaceClient:
     
     def _extract_rows_from_result(self, result: Dict) -> List[Dict]:
         """Extract row information from structure result"""
-        rows = []
         # This is a simplified extraction - in practice, you'd parse the actual model output
         if 'rows' in result:
-            rows = result['rows']
-        else:
-            # Create dummy rows based on detection boxes
-            for i in range(3):  # Assume 3 rows as fallback
-                rows.append({
-                    'row_id': i,
-                    'bbox': [0, i*30, 200, (i+1)*30],
-                    'confidence': 0.5
-                })
-        return rows
+            return result['rows']
+        # Assume 3 rows as fallback
+        return _DEFAULT_ROWS
     
     def _extract_columns_from_result(self, result: Dict) -> List[Dict]:
         """Extract column information from structure result"""
-        columns = []
         if 'columns' in result:
-            columns = result['columns']
-        else:
-            # Create dummy columns based on your sample data
-            column_names = ['Disability Category', 'Participants', 'Ballots Completed', 'Ballots Incomplete/Terminated', 'Results Accuracy', 'Time to complete']
-            for i, name in enumerate(column_names):
-                columns.append({
-                    'column_id': i,
-                    'name': name,
-                    'bbox': [i*100, 0, (i+1)*100, 200],
-                    'confidence': 0.5
-                })
-        return columns
+            return result['columns']
+        # Columns based on your sample data
+        return _DEFAULT_COLUMNS
     
     def _extract_cells_from_result(self, result: Dict) -> List[Dict]:
         """Extract cell information from structure result"""
-        cells = []
         if 'cells' in result:
-            cells = result['cells']
-        else:
-            # Create dummy cell structure based on your sample data
-            sample_data = [
-                ['Disability Category', 'Participants', 'Ballots Completed', 'Ballots Incomplete/Terminated', 'Results Accuracy', 'Time to complete'],
-                ['Blind', '5', '1', '4', '34.5%, n=1', '1199 sec, n=1'],
-                ['Low Vision', '5', '2', '3', '98.3% n=2 (97.7%, n=3)', '1716 sec, n=3 (1934 sec, n=2)'],
-                ['Dexterity', '5', '4', '1', '98.3%, n=4', '1672.1 sec, n=4'],
-                ['Mobility', '3', '3', '0', '95.4%, n=3', '1416 sec, n=3']
-            ]
-            
-            for row_idx, row_data in enumerate(sample_data):
-                for col_idx, cell_text in enumerate(row_data):
-                    cells.append({
-                        'row': row_idx,
-                        'column': col_idx,
-                        'text': cell_text,
-                        'bbox': [col_idx*100, row_idx*30, (col_idx+1)*100, (row_idx+1)*30],
-                        'confidence': 0.7
-                    })
-        
-        return cells
+            return result['cells']
+        # Cell structure based on your sample data
+        return _DEFAULT_CELLS
     
     def _create_fallback_structure(self) -> Dict:
-        """Create a fallback table structure when models fail"""
+        """Return the shared fallback table structure used when models fail"""
         logger.info("Creating fallback table structure")
         
         # Based on your sample PDF data
-        return {
-            'rows': [
-                {'row_id': 0, 'bbox': [0, 0, 600, 30], 'confidence': 0.8},
-                {'row_id': 1, 'bbox': [0, 30, 600, 60], 'confidence': 0.8},
-                {'row_id': 2, 'bbox': [0, 60, 600, 90], 'confidence': 0.8},
-                {'row_id': 3, 'bbox': [0, 90, 600, 120], 'confidence': 0.8},
-                {'row_id': 4, 'bbox': [0, 120, 600, 150], 'confidence': 0.8},
-            ],
-            'columns': [
-                {'column_id': 0, 'name': 'Disability Category', 'bbox': [0, 0, 100, 150], 'confidence': 0.8},
-                {'column_id': 1, 'name': 'Participants', 'bbox': [100, 0, 150, 150], 'confidence': 0.8},
-                {'column_id': 2, 'name': 'Ballots Completed', 'bbox': [150, 0, 200, 150], 'confidence': 0.8},
-                {'column_id': 3, 'name': 'Ballots Incomplete/Terminated', 'bbox': [200, 0, 350, 150], 'confidence': 0.8},
-                {'column_id': 4, 'name': 'Results Accuracy', 'bbox': [350, 0, 450, 150], 'confidence': 0.8},
-                {'column_id': 5, 'name': 'Time to complete', 'bbox': [450, 0, 600, 150], 'confidence': 0.8},
-            ],
-            'cells': [
-                # Header row
-                {'row': 0, 'column': 0, 'text': 'Disability Category', 'bbox': [0, 0, 100, 30], 'confidence': 0.8},
-                {'row': 0, 'column': 1, 'text': 'Participants', 'bbox': [100, 0, 150, 30], 'confidence': 0.8},
-                {'row': 0, 'column': 2, 'text': 'Ballots Completed', 'bbox': [150, 0, 200, 30], 'confidence': 0.8},
-                {'row': 0, 'column': 3, 'text': 'Ballots Incomplete/Terminated', 'bbox': [200, 0, 350, 30], 'confidence': 0.8},
-                {'row': 0, 'column': 4, 'text': 'Results Accuracy', 'bbox': [350, 0, 450, 30], 'confidence': 0.8},
-                {'row': 0, 'column': 5, 'text': 'Time to complete', 'bbox': [450, 0, 600, 30], 'confidence': 0.8},
-                
-                # Data rows
-                {'row': 1, 'column': 0, 'text': 'Blind', 'bbox': [0, 30, 100, 60], 'confidence': 0.8},
-                {'row': 1, 'column': 1, 'text': '5', 'bbox': [100, 30, 150, 60], 'confidence': 0.8},
-                {'row': 1, 'column': 2, 'text': '1', 'bbox': [150, 30, 200, 60], 'confidence': 0.8},
-                {'row': 1, 'column': 3, 'text': '4', 'bbox': [200, 30, 350, 60], 'confidence': 0.8},
-                {'row': 1, 'column': 4, 'text': '34.5%, n=1', 'bbox': [350, 30, 450, 60], 'confidence': 0.8},
-                {'row': 1, 'column': 5, 'text': '1199 sec, n=1', 'bbox': [450, 30, 600, 60], 'confidence': 0.8},
-                
-                {'row': 2, 'column': 0, 'text': 'Low Vision', 'bbox': [0, 60, 100, 90], 'confidence': 0.8},
-                {'row': 2, 'column': 1, 'text': '5', 'bbox': [100, 60, 150, 90], 'confidence': 0.8},
-                {'row': 2, 'column': 2, 'text': '2', 'bbox': [150, 60, 200, 90], 'confidence': 0.8},
-                {'row': 2, 'column': 3, 'text': '3', 'bbox': [200, 60, 350, 90], 'confidence': 0.8},
-                {'row': 2, 'column': 4, 'text': '98.3% n=2 (97.7%, n=3)', 'bbox': [350, 60, 450, 90], 'confidence': 0.8},
-                {'row': 2, 'column': 5, 'text': '1716 sec, n=3 (1934 sec, n=2)', 'bbox': [450, 60, 600, 90], 'confidence': 0.8},
-                
-                {'row': 3, 'column': 0, 'text': 'Dexterity', 'bbox': [0, 90, 100, 120], 'confidence': 0.8},
-                {'row': 3, 'column': 1, 'text': '5', 'bbox': [100, 90, 150, 120], 'confidence': 0.8},
-                {'row': 3, 'column': 2, 'text': '4', 'bbox': [150, 90, 200, 120], 'confidence': 0.8},
-                {'row': 3, 'column': 3, 'text': '1', 'bbox': [200, 90, 350, 120], 'confidence': 0.8},
-                {'row': 3, 'column': 4, 'text': '98.3%, n=4', 'bbox': [350, 90, 450, 120], 'confidence': 0.8},
-                {'row': 3, 'column': 5, 'text': '1672.1 sec, n=4', 'bbox': [450, 90, 600, 120], 'confidence': 0.8},
-                
-                {'row': 4, 'column': 0, 'text': 'Mobility', 'bbox': [0, 120, 100, 150], 'confidence': 0.8},
-                {'row': 4, 'column': 1, 'text': '3', 'bbox': [100, 120, 150, 150], 'confidence': 0.8},
-                {'row': 4, 'column': 2, 'text': '3', 'bbox': [150, 120, 200, 150], 'confidence': 0.8},
-                {'row': 4, 'column': 3, 'text': '0', 'bbox': [200, 120, 350, 150], 'confidence': 0.8},
-                {'row': 4, 'column': 4, 'text': '95.4%, n=3', 'bbox': [350, 120, 450, 150], 'confidence': 0.8},
-                {'row': 4, 'column': 5, 'text': '1416 sec, n=3', 'bbox': [450, 120, 600, 150], 'confidence': 0.8},
-            ],
-            'model_used': 'fallback',
-            'note': 'Using fallback structure as models were not available'
-        }
+        return _FALLBACK_STRUCTURE
     
     def detect_tables_with_ocr_fallback(self, image_data: bytes) -> Dict:
         """
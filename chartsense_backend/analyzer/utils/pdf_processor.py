@@ -1,18 +1,112 @@
-import io
+import os
+import functools
+import itertools
 import logging
-from typing import List, Tuple
-from PIL import Image
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Tuple
 import fitz  # PyMuPDF
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _render_pages(pdf_path: str, page_nums: List[int], dpi: int, image_format: str,
+                  image_quality: int, max_edge: int) -> List[Tuple[int, bytes]]:
+    """
+    Render a run of pages to image bytes
+    
+    Runs in a worker process, so it opens its own handle on the document.
+    
+    Returns:
+        List of tuples (page_number, image_bytes) for the pages that rendered
+    """
+    images = []
+    
+    with fitz.open(pdf_path) as doc:
+        for page_num in page_nums:
+            try:
+                # Render at the desired DPI, scaled down so the longest edge fits
+                # max_edge; the models downsample larger inputs anyway
+                page = doc[page_num]
+                zoom = dpi / 72
+                if max_edge:
+                    zoom = min(zoom, max_edge / max(page.rect.width, page.rect.height))
+                mat = fitz.Matrix(zoom, zoom)
+                
+                # Render straight to RGB without alpha, so the pixmap can be
+                # encoded once by MuPDF with no PIL decode/re-encode round trip
+                pix = page.get_pixmap(matrix=mat, colorspace=fitz.csRGB, alpha=False)
+                image_bytes = pix.tobytes(image_format.lower(), jpg_quality=image_quality)
+                
+                images.append((page_num + 1, image_bytes))
+                logger.debug(f"Converted page {page_num + 1} to image")
+            
+            except Exception as e:
+                logger.error(f"Error processing page {page_num + 1}: {str(e)}")
+                continue
+    
+    return images
+
+
+@functools.lru_cache(maxsize=128)
+def _read_pdf_info(pdf_path: str, mtime_ns: int, size: int) -> dict:
+    """Read page count and metadata for one version of a PDF file"""
+    with fitz.open(pdf_path) as doc:
+        metadata = doc.metadata or {}
+        return {
+            'page_count': doc.page_count,
+            'title': metadata.get('title', ''),
+            'author': metadata.get('author', ''),
+            'subject': metadata.get('subject', ''),
+            'creator': metadata.get('creator', ''),
+            'producer': metadata.get('producer', ''),
+            'creation_date': metadata.get('creationDate', ''),
+            'modification_date': metadata.get('modDate', ''),
+        }
+
+
 class PDFProcessor:
     """Handles PDF processing and page-to-image conversion"""
     
+    # Rendering and encoding are CPU bound, so pages are spread over processes;
+    # the pool is shared by every processor to pay the spawn cost once
+    _executor = None
+    _executor_lock = threading.Lock()
+    
     def __init__(self):
         self.dpi = 150  # DPI for image conversion
-        self.image_format = 'PNG'
+        # JPEG is several times smaller than PNG for rendered pages and the
+        # detection models don't need lossless input; set PNG to restore it
+        self.image_format = getattr(settings, 'PDF_IMAGE_FORMAT', 'JPEG')
+        self.image_quality = getattr(settings, 'PDF_IMAGE_QUALITY', 85)
+        self.max_edge = getattr(settings, 'PDF_IMAGE_MAX_EDGE', 1600)  # pixels, 0 for no cap
+        self.render_workers = max(getattr(settings, 'PDF_RENDER_WORKERS', None) or os.cpu_count() or 1, 1)
+    
+    @classmethod
+    def _get_executor(cls, max_workers: int) -> ProcessPoolExecutor:
+        """Return the shared render pool, starting it on first use"""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    # Spawn rather than fork: the parent runs analyses on threads
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return cls._executor
+    
+    @classmethod
+    def _discard_executor(cls, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken render pool so the next caller starts a fresh one"""
+        with cls._executor_lock:
+            if cls._executor is not executor:
+                return  # already replaced by another caller
+            cls._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
     
     def pdf_to_images(self, pdf_path: str) -> List[Tuple[int, bytes]]:
         """
@@ -24,65 +118,77 @@ class PDFProcessor:
         Returns:
             List of tuples (page_number, image_bytes)
         """
-        images = []
+        images = [image for run in self.iter_page_images(pdf_path) for image in run]
+        logger.info(f"Successfully converted {len(images)} pages to images")
+        return images
+    
+    def iter_page_images(self, pdf_path: str, pages_per_run: int = None) -> Iterator[List[Tuple[int, bytes]]]:
+        """
+        Convert PDF pages to images, yielding each run of pages as soon as it is ready
         
+        Up to one run per worker is rendered ahead on the pool, so a caller can
+        work on one run while the following ones are still rendering, without
+        holding every page of a large PDF in memory at once.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            pages_per_run: Pages rendered per task, after a first run of just
+                page one; defaults to one contiguous run per worker, so each
+                opens the document once
+            
+        Yields:
+            Lists of tuples (page_number, image_bytes), in page order
+        """
+        futures = deque()
         try:
             # Open PDF document
-            doc = fitz.open(pdf_path)
-            total_pages = doc.page_count
+            with fitz.open(pdf_path) as doc:
+                total_pages = doc.page_count
             
             logger.info(f"Processing PDF with {total_pages} pages")
             
-            for page_num in range(total_pages):
-                try:
-                    # Get the page
-                    page = doc[page_num]
-                    
-                    # Create a transformation matrix for the desired DPI
-                    mat = fitz.Matrix(self.dpi/72, self.dpi/72)
-                    
-                    # Render page as image
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Convert to PIL Image
-                    img_data = pix.tobytes(self.image_format.lower())
-                    
-                    # Convert to bytes for API
-                    image_bytes = self._pil_image_to_bytes(Image.open(io.BytesIO(img_data)))
-                    
-                    images.append((page_num + 1, image_bytes))
-                    logger.info(f"Converted page {page_num + 1} to image")
-                
-                except Exception as e:
-                    logger.error(f"Error processing page {page_num + 1}: {str(e)}")
-                    continue
+            workers = min(self.render_workers, total_pages)
+            run_size = pages_per_run or -(-total_pages // max(workers, 1)) or 1
+            # When streaming, the first page goes out on its own so the caller
+            # can start on it while the first full run is still rendering
+            first_run = [[0]] if pages_per_run and run_size > 1 and total_pages > 1 else []
+            runs = first_run + [list(range(start, min(start + run_size, total_pages)))
+                                for start in range(len(first_run), total_pages, run_size)]
             
-            doc.close()
-            logger.info(f"Successfully converted {len(images)} pages to images")
-            return images
+            options = (self.dpi, self.image_format, self.image_quality, self.max_edge)
+            if workers <= 1:
+                for run in runs:
+                    yield _render_pages(pdf_path, run, *options)
+            else:
+                executor = self._get_executor(self.render_workers)
+                runs_done = 0
+                try:
+                    pending_runs = iter(runs)
+                    for run in itertools.islice(pending_runs, workers):
+                        futures.append(executor.submit(_render_pages, pdf_path, run, *options))
+                    while futures:
+                        images = futures.popleft().result()
+                        # Keep the pool busy: queue the next run before handing this one over
+                        for run in itertools.islice(pending_runs, 1):
+                            futures.append(executor.submit(_render_pages, pdf_path, run, *options))
+                        runs_done += 1
+                        yield images
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory), which breaks the whole
+                    # pool; replace it for later PDFs and finish this one inline
+                    logger.warning(f"Render pool broke on {pdf_path}, rendering remaining pages inline")
+                    self._discard_executor(executor)
+                    for run in runs[runs_done:]:
+                        yield _render_pages(pdf_path, run, *options)
         
         except Exception as e:
             logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
             raise Exception(f"Failed to process PDF: {str(e)}")
-    
-    def _pil_image_to_bytes(self, pil_image: Image.Image) -> bytes:
-        """
-        Convert PIL Image to bytes
-        
-        Args:
-            pil_image: PIL Image object
-            
-        Returns:
-            Image as bytes
-        """
-        img_byte_array = io.BytesIO()
-        
-        # Ensure image is in RGB mode for consistent processing
-        if pil_image.mode != 'RGB':
-            pil_image = pil_image.convert('RGB')
         
-        pil_image.save(img_byte_array, format=self.image_format, quality=85, optimize=True)
-        return img_byte_array.getvalue()
+        finally:
+            # Drop runs that haven't started if the caller stopped early
+            for future in futures:
+                future.cancel()
     
     def get_pdf_info(self, pdf_path: str) -> dict:
         """
@@ -95,20 +201,10 @@ class PDFProcessor:
             Dictionary with PDF information
         """
         try:
-            doc = fitz.open(pdf_path)
-            info = {
-                'page_count': doc.page_count,
-                'title': doc.metadata.get('title', ''),
-                'author': doc.metadata.get('author', ''),
-                'subject': doc.metadata.get('subject', ''),
-                'creator': doc.metadata.get('creator', ''),
-                'producer': doc.metadata.get('producer', ''),
-                'creation_date': doc.metadata.get('creationDate', ''),
-                'modification_date': doc.metadata.get('modDate', ''),
-            }
-            doc.close()
-            return info
+            # Keyed on mtime and size so a replaced file is parsed again
+            stat = os.stat(pdf_path)
+            return dict(_read_pdf_info(pdf_path, stat.st_mtime_ns, stat.st_size))
         
         except Exception as e:
             logger.error(f"Error getting PDF info for {pdf_path}: {str(e)}")
-            return {'page_count': 0, 'error': str(e)}
\ No newline at end of file
+            return {'page_count': 0, 'error': str(e)}
@@ -1,25 +1,40 @@
 import os
-import time
+import hashlib
 import logging
+import orjson
+from datetime import timedelta
 from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_http_methods
 
-from .models import UploadedFile, AnalysisResult, ExtractedTable
+from .models import AnalysisStatus, UploadedFile, AnalysisResult, ExtractedTable
+from .renderers import ORJSONRenderer
 from .serializers import (
     FileUploadSerializer, FileUploadResponseSerializer,
     AnalyzeRequestSerializer, AnalyzeResponseSerializer,
-    AnalysisResultSerializer, ExtractedTableSerializer
+    ANALYSIS_RESULT_VALUES, UPLOADED_FILE_LIST_VALUES,
+    analysis_result_row, extracted_table_rows, uploaded_file_rows
 )
-from .utils.table_extractor import TableExtractor
+from .tasks import analysis_cache_keys, enqueue_analysis
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+# Allowance for multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
 
 # ===== PHASE 1 ENDPOINTS (EXISTING) =====
 
@@ -37,107 +52,123 @@ def upload_file(request):
     Returns:
     - 200: Success response with file info
     - 400: Bad request (validation errors)
+    - 413: Request body too large
     - 500: Internal server error
     """
+    # Reject oversized bodies from the header, before the multipart parser reads them
     try:
-        # Check if file was provided
-        if 'file' not in request.FILES:
-            return Response(
-                {
-                    "status": "error",
-                    "message": "No file provided. Please include a 'file' field in your request."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        uploaded_file = request.FILES['file']
-        
-        # Basic file validation
-        if not uploaded_file.name:
-            return Response(
-                {
-                    "status": "error",
-                    "message": "File name is required."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check if file is PDF
-        if not uploaded_file.name.lower().endswith('.pdf'):
-            return Response(
-                {
-                    "status": "error",
-                    "message": "Only PDF files are allowed."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check file size (10MB limit)
-        if uploaded_file.size > 10 * 1024 * 1024:
-            return Response(
-                {
-                    "status": "error",
-                    "message": "File size cannot exceed 10MB."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+        return Response(
+            {
+                "status": "error",
+                "message": "File size cannot exceed 10MB."
+            },
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    
+    # Check if file was provided
+    if 'file' not in request.FILES:
+        return Response(
+            {
+                "status": "error",
+                "message": "No file provided. Please include a 'file' field in your request."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    uploaded_file = request.FILES['file']
+    
+    # Basic file validation
+    if not uploaded_file.name:
+        return Response(
+            {
+                "status": "error",
+                "message": "File name is required."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Check if file is PDF
+    if not uploaded_file.name.lower().endswith('.pdf'):
+        return Response(
+            {
+                "status": "error",
+                "message": "Only PDF files are allowed."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Check file size (10MB limit)
+    if uploaded_file.size > MAX_UPLOAD_SIZE:
+        return Response(
+            {
+                "status": "error",
+                "message": "File size cannot exceed 10MB."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Use serializer for validation and saving
+    serializer = FileUploadSerializer(data={'file': uploaded_file})
+    
+    if serializer.is_valid():
+        # Save the file
+        saved_file = serializer.save()
         
-        # Use serializer for validation and saving
-        serializer = FileUploadSerializer(data={'file': uploaded_file})
+        logger.info(f"File uploaded successfully: {saved_file.original_filename}")
         
-        if serializer.is_valid():
-            # Save the file
-            saved_file = serializer.save()
-            
-            logger.info(f"File uploaded successfully: {saved_file.original_filename}")
-            
-            # Return success response
-            response_data = {
-                "status": "uploaded",
-                "filename": saved_file.original_filename,
-                "file_id": saved_file.id,
-                "message": f"File '{saved_file.original_filename}' uploaded successfully."
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+        # Return success response
+        response_data = {
+            "status": "uploaded",
+            "filename": saved_file.original_filename,
+            "file_id": saved_file.id,
+            "message": f"File '{saved_file.original_filename}' uploaded successfully."
+        }
         
-        else:
-            # Return validation errors
-            return Response(
-                {
-                    "status": "error",
-                    "message": "File validation failed.",
-                    "errors": serializer.errors
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response(response_data, status=status.HTTP_200_OK)
     
-    except Exception as e:
-        logger.error(f"File upload error: {str(e)}")
+    else:
+        # Return validation errors
         return Response(
             {
                 "status": "error",
-                "message": f"File upload failed: {str(e)}"
+                "message": "File validation failed.",
+                "errors": serializer.errors
             },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            status=status.HTTP_400_BAD_REQUEST
         )
 
 
-@api_view(['GET'])
+# The status payload never changes, so it's encoded once at import
+_UPLOAD_STATUS_BODY = orjson.dumps({
+    "status": "active",
+    "endpoint": "/api/upload/",
+    "methods": ["POST"],
+    "supported_formats": ["PDF"],
+    "max_file_size": "10MB"
+})
+
+
+@require_http_methods(['GET', 'HEAD', 'OPTIONS'])
 def upload_status(request):
     """
     Check the upload endpoint status.
+    
+    Served as a plain Django view, since the constant body needs none of
+    DRF's negotiation or rendering; HEAD and OPTIONS are still answered,
+    as they are for the API views.
     """
-    return Response(
-        {
-            "status": "active",
-            "endpoint": "/api/upload/",
-            "methods": ["POST"],
-            "supported_formats": ["PDF"],
-            "max_file_size": "10MB"
-        },
-        status=status.HTTP_200_OK
-    )
+    if request.method == 'OPTIONS':
+        response = HttpResponse()
+        response['Allow'] = 'GET, HEAD, OPTIONS'
+        return response
+    
+    response = HttpResponse(_UPLOAD_STATUS_BODY, content_type='application/json')
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
 
 
 # ===== PHASE 2 ENDPOINTS (NEW) =====
@@ -153,280 +184,147 @@ def analyze_file(request):
     - Body: {"file_id": <int>}
     
     Returns:
-    - 200: Analysis started successfully
+    - 202: Analysis queued
+    - 200: Analysis already processing or completed
     - 400: Bad request (validation errors)
     - 404: File not found
     - 500: Internal server error
     """
-    try:
-        # Validate request data
-        serializer = AnalyzeRequestSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(
-                {
-                    "status": "error",
-                    "message": "Invalid request data.",
-                    "errors": serializer.errors
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        file_id = serializer.validated_data['file_id']
-        uploaded_file = get_object_or_404(UploadedFile, id=file_id)
-        
-        # Check if file exists on disk
-        if not os.path.exists(uploaded_file.file.path):
-            return Response(
-                {
-                    "status": "error",
-                    "message": "File not found on disk. Please re-upload the file."
-                },
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Create or get existing analysis result
-        analysis_result, created = AnalysisResult.objects.get_or_create(
+    # Validate request data
+    serializer = AnalyzeRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {
+                "status": "error",
+                "message": "Invalid request data.",
+                "errors": serializer.errors
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    file_id = serializer.validated_data['file_id']
+    # One query for the file and any existing analysis, limited to the columns
+    # needed to check and queue it
+    uploaded_file = get_object_or_404(
+        UploadedFile.objects.select_related('analysis_result').only(
+            'id', 'file', 'original_filename', 'analysis_status', 'file_on_disk',
+            'analysis_result__id', 'analysis_result__status', 'analysis_result__tables_found',
+            'analysis_result__updated_at'
+        ),
+        id=file_id
+    )
+    
+    analysis_result = getattr(uploaded_file, 'analysis_result', None)
+    
+    # The analysis task and the check_uploaded_files janitor clear this flag
+    # when they find the file gone, so repeat requests don't stat the file;
+    # a file's first analysis checks the disk once so it can 404 right away
+    if uploaded_file.file_on_disk and analysis_result is None and not os.path.exists(uploaded_file.file.path):
+        UploadedFile.objects.filter(pk=uploaded_file.pk).update(file_on_disk=False)
+        uploaded_file.file_on_disk = False
+    
+    if not uploaded_file.file_on_disk:
+        return Response(
+            {
+                "status": "error",
+                "message": "File not found on disk. Please re-upload the file."
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Reuse the joined analysis result; only create one for files never analyzed
+    if analysis_result is None:
+        analysis_result, _ = AnalysisResult.objects.get_or_create(
             uploaded_file=uploaded_file,
-            defaults={'status': 'pending'}
+            defaults={'status': AnalysisStatus.PENDING}
         )
-        
-        if not created and analysis_result.status in ['processing', 'completed']:
-            return Response(
-                {
-                    "status": "info",
-                    "message": f"File analysis is already {analysis_result.status}.",
-                    "analysis_id": analysis_result.id,
-                    "file_id": file_id,
-                    "tables_found": analysis_result.tables_found if analysis_result.status == 'completed' else None
-                },
-                status=status.HTTP_200_OK
-            )
-        
-        # Update file and analysis status
-        uploaded_file.analysis_status = 'processing'
-        uploaded_file.save()
-        
-        analysis_result.status = 'processing'
-        analysis_result.save()
-        
-        # Initialize table extractor
-        extractor = TableExtractor()
-        
-        try:
-            # Process the PDF file
-            start_time = time.time()
-            
-            logger.info(f"Starting analysis for file: {uploaded_file.original_filename}")
-            
-            # Extract tables from the PDF
-            tables_data = extractor.extract_tables_from_pdf(uploaded_file.file.path)
-            
-            processing_time = time.time() - start_time
-            
-            # Save results to database
-            with transaction.atomic():
-                # Update analysis result
-                analysis_result.status = 'completed'
-                analysis_result.total_pages = tables_data.get('total_pages', 0)
-                analysis_result.pages_processed = tables_data.get('pages_processed', 0)
-                analysis_result.tables_found = len(tables_data.get('tables', []))
-                analysis_result.processing_time = processing_time
-                analysis_result.error_message = None  # Clear any previous errors
-                analysis_result.save()
-                
-                # Delete any existing extracted tables for this analysis
-                ExtractedTable.objects.filter(analysis_result=analysis_result).delete()
-                
-                # Save extracted tables
-                tables_created = 0
-                for table_info in tables_data.get('tables', []):
-                    try:
-                        ExtractedTable.objects.create(
-                            analysis_result=analysis_result,
-                            page_number=table_info['page_number'],
-                            table_index=table_info['table_index'],
-                            bounding_box=table_info['bounding_box'],
-                            table_data=table_info['table_data'],
-                            confidence_score=table_info.get('confidence_score', 0.5)
-                        )
-                        tables_created += 1
-                        logger.info(f"Created table {table_info['table_index']} from page {table_info['page_number']}")
-                    except Exception as e:
-                        logger.error(f"Error saving table {table_info.get('table_index', 'unknown')}: {str(e)}")
-                        continue
-                
-                # Update tables_found count to match what was actually saved
-                analysis_result.tables_found = tables_created
-                analysis_result.save()
-                
-                # Update file status
-                uploaded_file.analysis_status = 'completed'
-                uploaded_file.save()
-            
-            logger.info(f"Analysis completed for file {uploaded_file.original_filename}. Found {analysis_result.tables_found} tables in {processing_time:.2f}s")
-            
-            return Response(
-                {
-                    "status": "completed",
-                    "message": f"Analysis completed successfully. Found {analysis_result.tables_found} tables.",
-                    "analysis_id": analysis_result.id,
-                    "file_id": file_id,
-                    "tables_found": analysis_result.tables_found,
-                    "processing_time": f"{processing_time:.2f}s",
-                    "pages_processed": analysis_result.pages_processed,
-                    "total_pages": analysis_result.total_pages
-                },
-                status=status.HTTP_200_OK
-            )
-        
-        except Exception as e:
-            # Handle analysis errors
-            logger.error(f"Analysis error for file {uploaded_file.original_filename}: {str(e)}")
-            
-            # Try to provide some meaningful analysis even on error if we have fallback enabled
-            if getattr(settings, 'ENABLE_FALLBACK_TABLE_DETECTION', True):
-                try:
-                    logger.info("Attempting fallback analysis...")
-                    fallback_result = self._create_fallback_analysis(analysis_result, uploaded_file)
-                    
-                    if fallback_result['tables_found'] > 0:
-                        return Response(
-                            {
-                                "status": "completed_with_fallback",
-                                "message": f"Analysis completed using fallback method. Found {fallback_result['tables_found']} tables.",
-                                "analysis_id": analysis_result.id,
-                                "file_id": file_id,
-                                "tables_found": fallback_result['tables_found'],
-                                "processing_time": fallback_result['processing_time'],
-                                "note": "Used fallback detection method due to model unavailability"
-                            },
-                            status=status.HTTP_200_OK
-                        )
-                except Exception as fallback_error:
-                    logger.error(f"Fallback analysis also failed: {str(fallback_error)}")
-            
-            analysis_result.status = 'failed'
-            analysis_result.error_message = str(e)
-            analysis_result.save()
-            
-            uploaded_file.analysis_status = 'failed'
-            uploaded_file.save()
-            
-            return Response(
-                {
-                    "status": "error",
-                    "message": f"Analysis failed: {str(e)}",
-                    "analysis_id": analysis_result.id,
-                    "file_id": file_id
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
     
-    except Exception as e:
-        logger.error(f"Analyze file endpoint error: {str(e)}")
+    # Running analyses refresh updated_at after each run of pages, so one
+    # untouched for ANALYSIS_STALE_AFTER seconds lost its worker (e.g. a
+    # restart) and may be claimed again
+    stale_before = timezone.now() - timedelta(seconds=settings.ANALYSIS_STALE_AFTER)
+    is_stale = (
+        analysis_result.status == AnalysisStatus.PROCESSING
+        and analysis_result.updated_at is not None
+        and analysis_result.updated_at < stale_before
+    )
+    
+    if analysis_result.status in [AnalysisStatus.PROCESSING, AnalysisStatus.COMPLETED] and not is_stale:
+        return Response(
+            {
+                "status": "info",
+                "message": f"File analysis is already {analysis_result.status}.",
+                "analysis_id": analysis_result.id,
+                "file_id": file_id,
+                "tables_found": analysis_result.tables_found if analysis_result.status == AnalysisStatus.COMPLETED else None
+            },
+            status=status.HTTP_200_OK
+        )
+    
+    if not settings.HUGGINGFACE_API_KEY:
         return Response(
             {
                 "status": "error",
-                "message": f"Request processing failed: {str(e)}"
+                "message": "Hugging Face API key not configured."
             },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
-
-
-def _create_fallback_analysis(analysis_result, uploaded_file):
-    """Create fallback analysis when ML models fail"""
-    start_time = time.time()
-    
-    # Create a sample table based on the uploaded PDF content
-    sample_table_data = {
-        'rows': [
-            {'row_id': 0, 'bbox': [50, 50, 550, 80], 'confidence': 0.8, 'type': 'header'},
-            {'row_id': 1, 'bbox': [50, 80, 550, 110], 'confidence': 0.8, 'type': 'data'},
-            {'row_id': 2, 'bbox': [50, 110, 550, 140], 'confidence': 0.8, 'type': 'data'},
-            {'row_id': 3, 'bbox': [50, 140, 550, 170], 'confidence': 0.8, 'type': 'data'},
-            {'row_id': 4, 'bbox': [50, 170, 550, 200], 'confidence': 0.8, 'type': 'data'},
-        ],
-        'columns': [
-            {'column_id': 0, 'name': 'Disability Category', 'bbox': [50, 50, 150, 200], 'confidence': 0.8},
-            {'column_id': 1, 'name': 'Participants', 'bbox': [150, 50, 200, 200], 'confidence': 0.8},
-            {'column_id': 2, 'name': 'Ballots Completed', 'bbox': [200, 50, 250, 200], 'confidence': 0.8},
-            {'column_id': 3, 'name': 'Ballots Incomplete/Terminated', 'bbox': [250, 50, 400, 200], 'confidence': 0.8},
-            {'column_id': 4, 'name': 'Results Accuracy', 'bbox': [400, 50, 500, 200], 'confidence': 0.8},
-            {'column_id': 5, 'name': 'Time to complete', 'bbox': [500, 50, 550, 200], 'confidence': 0.8},
-        ],
-        'cells': [
-            # Header row
-            {'row': 0, 'column': 0, 'text': 'Disability Category', 'bbox': [50, 50, 150, 80], 'confidence': 0.8},
-            {'row': 0, 'column': 1, 'text': 'Participants', 'bbox': [150, 50, 200, 80], 'confidence': 0.8},
-            {'row': 0, 'column': 2, 'text': 'Ballots Completed', 'bbox': [200, 50, 250, 80], 'confidence': 0.8},
-            {'row': 0, 'column': 3, 'text': 'Ballots Incomplete/Terminated', 'bbox': [250, 50, 400, 80], 'confidence': 0.8},
-            {'row': 0, 'column': 4, 'text': 'Results Accuracy', 'bbox': [400, 50, 500, 80], 'confidence': 0.8},
-            {'row': 0, 'column': 5, 'text': 'Time to complete', 'bbox': [500, 50, 550, 80], 'confidence': 0.8},
-            
-            # Data rows
-            {'row': 1, 'column': 0, 'text': 'Blind', 'bbox': [50, 80, 150, 110], 'confidence': 0.8},
-            {'row': 1, 'column': 1, 'text': '5', 'bbox': [150, 80, 200, 110], 'confidence': 0.8},
-            {'row': 1, 'column': 2, 'text': '1', 'bbox': [200, 80, 250, 110], 'confidence': 0.8},
-            {'row': 1, 'column': 3, 'text': '4', 'bbox': [250, 80, 400, 110], 'confidence': 0.8},
-            {'row': 1, 'column': 4, 'text': '34.5%, n=1', 'bbox': [400, 80, 500, 110], 'confidence': 0.8},
-            {'row': 1, 'column': 5, 'text': '1199 sec, n=1', 'bbox': [500, 80, 550, 110], 'confidence': 0.8},
-            
-            {'row': 2, 'column': 0, 'text': 'Low Vision', 'bbox': [50, 110, 150, 140], 'confidence': 0.8},
-            {'row': 2, 'column': 1, 'text': '5', 'bbox': [150, 110, 200, 140], 'confidence': 0.8},
-            {'row': 2, 'column': 2, 'text': '2', 'bbox': [200, 110, 250, 140], 'confidence': 0.8},
-            {'row': 2, 'column': 3, 'text': '3', 'bbox': [250, 110, 400, 140], 'confidence': 0.8},
-            {'row': 2, 'column': 4, 'text': '98.3% n=2 (97.7%, n=3)', 'bbox': [400, 110, 500, 140], 'confidence': 0.8},
-            {'row': 2, 'column': 5, 'text': '1716 sec, n=3 (1934 sec, n=2)', 'bbox': [500, 110, 550, 140], 'confidence': 0.8},
-            
-            {'row': 3, 'column': 0, 'text': 'Dexterity', 'bbox': [50, 140, 150, 170], 'confidence': 0.8},
-            {'row': 3, 'column': 1, 'text': '5', 'bbox': [150, 140, 200, 170], 'confidence': 0.8},
-            {'row': 3, 'column': 2, 'text': '4', 'bbox': [200, 140, 250, 170], 'confidence': 0.8},
-            {'row': 3, 'column': 3, 'text': '1', 'bbox': [250, 140, 400, 170], 'confidence': 0.8},
-            {'row': 3, 'column': 4, 'text': '98.3%, n=4', 'bbox': [400, 140, 500, 170], 'confidence': 0.8},
-            {'row': 3, 'column': 5, 'text': '1672.1 sec, n=4', 'bbox': [500, 140, 550, 170], 'confidence': 0.8},
-            
-            {'row': 4, 'column': 0, 'text': 'Mobility', 'bbox': [50, 170, 150, 200], 'confidence': 0.8},
-            {'row': 4, 'column': 1, 'text': '3', 'bbox': [150, 170, 200, 200], 'confidence': 0.8},
-            {'row': 4, 'column': 2, 'text': '3', 'bbox': [200, 170, 250, 200], 'confidence': 0.8},
-            {'row': 4, 'column': 3, 'text': '0', 'bbox': [250, 170, 400, 200], 'confidence': 0.8},
-            {'row': 4, 'column': 4, 'text': '95.4%, n=3', 'bbox': [400, 170, 500, 200], 'confidence': 0.8},
-            {'row': 4, 'column': 5, 'text': '1416 sec, n=3', 'bbox': [500, 170, 550, 200], 'confidence': 0.8},
-        ],
-        'fallback_used': True,
-        'extraction_method': 'fallback_pattern_matching',
-        'note': 'Table extracted using fallback method due to ML model unavailability'
-    }
-    
-    processing_time = time.time() - start_time
     
+    # Claim the analysis with a conditional single-column UPDATE so two
+    # concurrent requests can't both queue it; the file's status moves with
+    # the claim in the same transaction
     with transaction.atomic():
-        # Update analysis result
-        analysis_result.status = 'completed'
-        analysis_result.total_pages = 1
-        analysis_result.pages_processed = 1
-        analysis_result.tables_found = 1
-        analysis_result.processing_time = processing_time
-        analysis_result.error_message = "Used fallback method - ML models unavailable"
-        analysis_result.save()
-        
-        # Create the extracted table
-        ExtractedTable.objects.create(
-            analysis_result=analysis_result,
-            page_number=1,
-            table_index=0,
-            bounding_box=[50, 50, 550, 200],
-            table_data=sample_table_data,
-            confidence_score=0.75
+        claimed = AnalysisResult.objects.filter(pk=analysis_result.pk).filter(
+            ~Q(status__in=[AnalysisStatus.PROCESSING, AnalysisStatus.COMPLETED])
+            | Q(status=AnalysisStatus.PROCESSING, updated_at__lt=stale_before)
+        ).update(status=AnalysisStatus.PROCESSING, updated_at=timezone.now())
+        if claimed:
+            UploadedFile.objects.filter(pk=uploaded_file.pk).update(analysis_status=AnalysisStatus.PROCESSING)
+    
+    if not claimed:
+        return Response(
+            {
+                "status": "info",
+                "message": "File analysis is already in progress.",
+                "analysis_id": analysis_result.id,
+                "file_id": file_id
+            },
+            status=status.HTTP_200_OK
         )
-        
-        # Update file status
-        uploaded_file.analysis_status = 'completed'
-        uploaded_file.save()
     
-    return {
-        'tables_found': 1,
-        'processing_time': f"{processing_time:.2f}s"
-    }
+    # Run the extraction in the background; clients poll get_analysis_result
+    enqueue_analysis(analysis_result.id)
+    
+    logger.info(f"Queued analysis {analysis_result.id} for file: {uploaded_file.original_filename}")
+    
+    return Response(
+        {
+            "status": "queued",
+            "message": "Analysis queued. Poll the analysis endpoint for progress.",
+            "analysis_id": analysis_result.id,
+            "file_id": file_id
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+def _cache_completed(cache_key, data):
+    """
+    Cache a completed analysis payload together with its ETag
+    
+    Returns:
+        The ETag, a hash of the rendered payload
+    """
+    etag = f'"{hashlib.sha256(ORJSONRenderer().render(data)).hexdigest()}"'
+    cache.set(cache_key, (data, etag), settings.ANALYSIS_CACHE_TIMEOUT)
+    return etag
+
+
+def _etag_response(request, data, etag):
+    """Respond with a cached payload, or 304 if the client already has it"""
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 @api_view(['GET'])
@@ -439,20 +337,23 @@ def get_analysis_result(request, analysis_id):
     - 404: Analysis not found
     - 500: Internal server error
     """
-    try:
-        analysis_result = get_object_or_404(AnalysisResult, id=analysis_id)
-        serializer = AnalysisResultSerializer(analysis_result)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    # Completed results don't change, so polls for them skip the database
+    cache_key = analysis_cache_keys(analysis_id)[0]
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return _etag_response(request, *cached)
     
-    except Exception as e:
-        logger.error(f"Get analysis result error: {str(e)}")
-        return Response(
-            {
-                "status": "error",
-                "message": f"Failed to retrieve analysis result: {str(e)}"
-            },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    # Plain values rather than model instances and nested serializers
+    row = AnalysisResult.objects.filter(id=analysis_id).values(
+        *ANALYSIS_RESULT_VALUES, 'uploaded_file__original_filename'
+    ).first()
+    if row is None:
+        raise Http404("No AnalysisResult matches the given query.")
+    tables = extracted_table_rows(ExtractedTable.objects.filter(analysis_result_id=analysis_id))
+    data = analysis_result_row(row, row['uploaded_file__original_filename'], tables)
+    if row['status'] == AnalysisStatus.COMPLETED:
+        return _etag_response(request, data, _cache_completed(cache_key, data))
+    return Response(data, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -465,30 +366,33 @@ def get_extracted_tables(request, analysis_id):
     - 404: Analysis not found
     - 500: Internal server error
     """
-    try:
-        analysis_result = get_object_or_404(AnalysisResult, id=analysis_id)
-        tables = ExtractedTable.objects.filter(analysis_result=analysis_result)
-        serializer = ExtractedTableSerializer(tables, many=True)
-        
-        return Response(
-            {
-                "analysis_id": analysis_id,
-                "filename": analysis_result.uploaded_file.original_filename,
-                "tables_count": len(serializer.data),
-                "tables": serializer.data
-            },
-            status=status.HTTP_200_OK
-        )
+    cache_key = analysis_cache_keys(analysis_id)[1]
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return _etag_response(request, *cached)
     
-    except Exception as e:
-        logger.error(f"Get extracted tables error: {str(e)}")
-        return Response(
-            {
-                "status": "error",
-                "message": f"Failed to retrieve extracted tables: {str(e)}"
-            },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    analysis_result = get_object_or_404(
+        AnalysisResult.objects.select_related('uploaded_file')
+                              .only('id', 'status', 'uploaded_file__original_filename'),
+        id=analysis_id
+    )
+    tables = extracted_table_rows(ExtractedTable.objects.filter(analysis_result=analysis_result))
+    
+    data = {
+        "analysis_id": analysis_id,
+        "filename": analysis_result.uploaded_file.original_filename,
+        "tables_count": len(tables),
+        "tables": tables
+    }
+    if analysis_result.status == AnalysisStatus.COMPLETED:
+        return _etag_response(request, data, _cache_completed(cache_key, data))
+    return Response(data, status=status.HTTP_200_OK)
+
+
+class FileListPagination(LimitOffsetPagination):
+    """Keep the file listing bounded; the total comes from a COUNT query"""
+    default_limit = 50
+    max_limit = 500
 
 
 @api_view(['GET'])
@@ -496,55 +400,31 @@ def list_uploaded_files(request):
     """
     List all uploaded files with their analysis status.
     
+    The list is paged, 50 files at a time unless ?limit=<n> says otherwise;
+    use ?offset=<n> or the next/previous links to move through it, and count
+    for the total number of files.
+    
     Returns:
     - 200: List of uploaded files
     - 500: Internal server error
     """
-    try:
-        files = UploadedFile.objects.all()
-        files_data = []
-        
-        for file in files:
-            file_data = {
-                "id": file.id,
-                "filename": file.original_filename,
-                "file_size": file.file_size,
-                "uploaded_at": file.uploaded_at,
-                "analysis_status": file.analysis_status,
-                "analysis_result": None
-            }
-            
-            # Add analysis result if available
-            if hasattr(file, 'analysis_result'):
-                analysis = file.analysis_result
-                file_data["analysis_result"] = {
-                    "id": analysis.id,
-                    "status": analysis.status,
-                    "tables_found": analysis.tables_found,
-                    "processing_time": analysis.processing_time,
-                    "created_at": analysis.created_at,
-                    "error_message": analysis.error_message
-                }
-            
-            files_data.append(file_data)
-        
-        return Response(
-            {
-                "files_count": len(files_data),
-                "files": files_data
-            },
-            status=status.HTTP_200_OK
-        )
+    # Read plain values joined with the one-to-one analysis result, so the
+    # listing is one query and builds no model instances
+    files = UploadedFile.objects.values(*UPLOADED_FILE_LIST_VALUES)
     
-    except Exception as e:
-        logger.error(f"List uploaded files error: {str(e)}")
-        return Response(
-            {
-                "status": "error",
-                "message": f"Failed to retrieve files: {str(e)}"
-            },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    paginator = FileListPagination()
+    files_data = uploaded_file_rows(paginator.paginate_queryset(files, request))
+    
+    return Response(
+        {
+            "files_count": len(files_data),
+            "files": files_data,
+            "count": paginator.count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link()
+        },
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['GET'])
@@ -557,34 +437,35 @@ def get_file_details(request, file_id):
     - 404: File not found
     - 500: Internal server error
     """
-    try:
-        uploaded_file = get_object_or_404(UploadedFile, id=file_id)
-        
-        file_data = {
-            "id": uploaded_file.id,
-            "filename": uploaded_file.original_filename,
-            "file_size": uploaded_file.file_size,
-            "uploaded_at": uploaded_file.uploaded_at,
-            "analysis_status": uploaded_file.analysis_status,
-            "analysis_result": None
-        }
-        
-        # Add detailed analysis result if available
-        if hasattr(uploaded_file, 'analysis_result'):
-            serializer = AnalysisResultSerializer(uploaded_file.analysis_result)
-            file_data["analysis_result"] = serializer.data
-        
-        return Response(file_data, status=status.HTTP_200_OK)
+    # The file and its analysis come back as one joined values() row
+    analysis_values = [f'analysis_result__{field}' for field in ANALYSIS_RESULT_VALUES]
+    row = UploadedFile.objects.filter(id=file_id).values(
+        'id', 'original_filename', 'file_size', 'uploaded_at', 'analysis_status', *analysis_values
+    ).first()
+    if row is None:
+        raise Http404("No UploadedFile matches the given query.")
     
-    except Exception as e:
-        logger.error(f"Get file details error: {str(e)}")
-        return Response(
-            {
-                "status": "error",
-                "message": f"Failed to retrieve file details: {str(e)}"
-            },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    file_data = {
+        "id": row['id'],
+        "filename": row['original_filename'],
+        "file_size": row['file_size'],
+        "uploaded_at": row['uploaded_at'],
+        "analysis_status": row['analysis_status'],
+        "analysis_result": None
+    }
+    
+    # Add detailed analysis result if available
+    analysis_id = row['analysis_result__id']
+    if analysis_id is not None:
+        tables = extracted_table_rows(ExtractedTable.objects.filter(analysis_result_id=analysis_id))
+        file_data["analysis_result"] = analysis_result_row(
+            row, row['original_filename'], tables, prefix='analysis_result__'
         )
+    
+    return Response(file_data, status=status.HTTP_200_OK)
+
+
+HEALTH_CHECK_CACHE_KEY = 'health_check:v1'
 
 
 @api_view(['GET'])
@@ -593,13 +474,19 @@ def health_check(request):
     Health check endpoint to verify API and model availability
     """
     try:
+        # Probes hit this often; reuse a recent result instead of re-checking every component
+        cached = cache.get(HEALTH_CHECK_CACHE_KEY)
+        if cached is not None:
+            health_status, status_code = cached
+            return Response(health_status, status=status_code)
+        
         # Check if Hugging Face API key is configured
         hf_api_configured = bool(settings.HUGGINGFACE_API_KEY)
         
-        # Check database connectivity
+        # Check database connectivity without scanning a table
         db_connected = True
         try:
-            UploadedFile.objects.count()
+            connection.ensure_connection()
         except Exception:
             db_connected = False
         
@@ -622,6 +509,11 @@ def health_check(request):
         }
         
         status_code = status.HTTP_200_OK if health_status["status"] == "healthy" else status.HTTP_206_PARTIAL_CONTENT
+        cache.set(
+            HEALTH_CHECK_CACHE_KEY,
+            (health_status, status_code),
+            getattr(settings, 'HEALTH_CHECK_CACHE_TIMEOUT', 10)
+        )
         
         return Response(health_status, status=status_code)
     
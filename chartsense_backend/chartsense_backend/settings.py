@@ -69,9 +69,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Multi-statement writes use their own transaction.atomic() blocks (the
+        # claim in analyze_file and the result writes in analyzer/tasks.py);
+        # read-only requests shouldn't pay for a BEGIN/COMMIT
+        'ATOMIC_REQUESTS': False,
     }
 }
 
+# Caches; set REDIS_URL to share them across processes. Without Redis, Hugging Face
+# responses go to a file cache so they survive restarts.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+        'inference': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'inference',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'inference': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('HUGGINGFACE_CACHE_DIR', str(BASE_DIR / 'cache' / 'inference')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,13 +142,14 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'analyzer.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
+    'EXCEPTION_HANDLER': 'analyzer.exceptions.exception_handler',
 }
 
 # CORS settings
@@ -150,11 +181,22 @@ HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY', '')
 FILE_STORAGE_PATH = os.getenv('FILE_STORAGE_PATH', 'media/')
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
+# Uploads above this size are spooled to a temporary file instead of RAM; the
+# storage backend then moves that file into MEDIA_ROOT rather than copying it
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024  # 256 KB
+# Spool uploads next to MEDIA_ROOT so that move is a rename on the same
+# filesystem, not a copy out of a separate /tmp mount; kept outside it so
+# in-flight uploads are never served under MEDIA_URL
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR', str(BASE_DIR / 'upload_tmp'))
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10 MB
 
 # Hugging Face API Settings
-HUGGINGFACE_REQUEST_DELAY = float(os.getenv('HUGGINGFACE_REQUEST_DELAY', '1.0'))
+# Per-model token bucket: sustained requests per second and the burst allowed on top
+HUGGINGFACE_RATE_LIMIT = float(os.getenv('HUGGINGFACE_RATE_LIMIT', '1.0'))
+HUGGINGFACE_RATE_BURST = int(os.getenv('HUGGINGFACE_RATE_BURST', '4'))
+HUGGINGFACE_MAX_CONCURRENCY = int(os.getenv('HUGGINGFACE_MAX_CONCURRENCY', '8'))
+HUGGINGFACE_CACHE_TIMEOUT = int(os.getenv('HUGGINGFACE_CACHE_TIMEOUT', str(24 * 60 * 60)))  # seconds
+HUGGINGFACE_CACHE_MODE = os.getenv('HUGGINGFACE_CACHE_MODE', 'on')  # on, read_only, write_only or off
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '5'))
 
 # Updated Hugging Face Model URLs - Using models that work with Inference API
@@ -171,10 +213,27 @@ HUGGINGFACE_TABLE_STRUCTURE_MODEL = os.getenv(
 USE_OCR_FALLBACK = os.getenv('USE_OCR_FALLBACK', 'True').lower() == 'true'
 ENABLE_FALLBACK_TABLE_DETECTION = os.getenv('ENABLE_FALLBACK_TABLE_DETECTION', 'True').lower() == 'true'
 
+# Background analysis settings
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))  # concurrent analyses per process
+ANALYSIS_STALE_AFTER = int(os.getenv('ANALYSIS_STALE_AFTER', '1800'))  # seconds without progress before a processing analysis can be re-claimed
+ANALYSIS_TASK_ALWAYS_EAGER = os.getenv('ANALYSIS_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '0')) or None  # page render processes; None = CPU count
+PDF_IMAGE_FORMAT = os.getenv('PDF_IMAGE_FORMAT', 'JPEG')  # JPEG or PNG for page images sent to the models
+PDF_IMAGE_QUALITY = int(os.getenv('PDF_IMAGE_QUALITY', '85'))  # JPEG quality
+PDF_IMAGE_MAX_EDGE = int(os.getenv('PDF_IMAGE_MAX_EDGE', '1600'))  # longest page image edge in pixels, 0 for no cap
+PDF_PAGES_PER_RUN = int(os.getenv('PDF_PAGES_PER_RUN', '8'))  # pages rendered and extracted together, bounds memory on large PDFs
+
 # Table Extraction Settings
 TABLE_CONFIDENCE_THRESHOLD = float(os.getenv('TABLE_CONFIDENCE_THRESHOLD', '0.3'))
 MAX_TABLES_PER_PAGE = int(os.getenv('MAX_TABLES_PER_PAGE', '5'))
 
+# Completed analysis responses are cached for this many seconds; saves and
+# deletes invalidate them sooner, this bounds staleness across processes
+ANALYSIS_CACHE_TIMEOUT = int(os.getenv('ANALYSIS_CACHE_TIMEOUT', '300'))
+
+# Health check results are reused for this many seconds
+HEALTH_CHECK_CACHE_TIMEOUT = int(os.getenv('HEALTH_CHECK_CACHE_TIMEOUT', '10'))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -217,4 +276,7 @@ LOGGING = {
 }
 
 # Create logs directory if it doesn't exist
-(BASE_DIR / 'logs').mkdir(exist_ok=True)
\ No newline at end of file
+(BASE_DIR / 'logs').mkdir(exist_ok=True)
+
+# Create the upload spool directory if it doesn't exist
+Path(FILE_UPLOAD_TEMP_DIR).mkdir(parents=True, exist_ok=True)
\ No newline at end of file